@@ -5,6 +5,7 @@ import subprocess
 import tempfile
 import shutil
 import logging
+import functools
 from dataclasses import dataclass
 from typing import Optional
 from typing import List, Dict, Optional, Any, Callable
@@ -226,10 +227,12 @@ def safe_to_int(value):
         return int(value, 10) # 转换为十进制
     return int(value) if value is not None else 0
 
+@functools.lru_cache(maxsize=None)
 def get_tool_path(tool_name: str, bin_dir: Optional[str] = None) -> str:
     """
     Get tool path, prioritize from specified bin directory, then from system PATH.
     Added support for different operating systems, especially executable file extensions on Windows.
+    Lookups are cached for the lifetime of the process.
 
     Args:
         tool_name: Tool name.
@@ -243,10 +243,11 @@ class ComImageHandler(ImageHandler):
             if not part.partition_type_uuid:
                 part.partition_type_uuid = "L"
             if part.partition_type_uuid:
-                uuid = get_gpt_partition_type(part.partition_type_uuid).bytes
-                if not uuid:
-                    raise ValueError(f"Invalid type shortcut: {part.partition_type_uuid}")
-                part.partition_uuid = uuid
+                try:
+                    uuid.UUID(part.partition_type_uuid)
+                except ValueError:
+                    if not get_gpt_partition_type_bytes(part.partition_type_uuid):
+                        raise ValueError(f"Invalid type shortcut: {part.partition_type_uuid}")
 
     def setup_uuid(self) -> None:
         """Setup disk UUID and signature"""
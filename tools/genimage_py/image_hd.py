@@ -448,13 +448,16 @@ class HdImageHandler(ComImageHandler):
 
         struct.pack_into('<16s', ebr_data, 16, entry2.to_bytes())
 
-    def _build_gpt_table(self, gpt_entries: List[GptPartitionEntry]) -> bytearray:
-        """Build GPT partition table data"""
+    def _build_gpt_table(self, gpt_entries: List[GptPartitionEntry]) -> Tuple[bytearray, int]:
+        """Build GPT partition table data and its CRC32"""
+        # Unused entries stay zero and are still covered by the CRC
         table_data = bytearray(GPT_ENTRIES * 128)
-        for entry in enumerate(gpt_entries[:GPT_ENTRIES]):
-            table_data += entry.to_bytes()
+        for i, entry in enumerate(gpt_entries[:GPT_ENTRIES]):
+            entry.pack_into(table_data, i * 128)
 
-        return table_data
+        table_crc = zlib.crc32(table_data)
+
+        return table_data, table_crc & 0xFFFFFFFF
 
     def _create_gpt_entry(self, part: Partition) -> GptPartitionEntry:
         """Create a single GPT partition table entry"""
@@ -463,25 +466,25 @@ class HdImageHandler(ComImageHandler):
         # Set partition type UUID
         if part.partition_type_uuid:
             try:
-                entry.type_uuid = uuid.UUID(part.partition_type_uuid).bytes
+                entry.type_uuid = uuid.UUID(part.partition_type_uuid).bytes_le
             except ValueError:
                 # Try to find type alias
-                type_uuid = get_gpt_partition_type(part.partition_type_uuid)
+                type_uuid = get_gpt_partition_type_bytes(part.partition_type_uuid)
                 if type_uuid:
-                    entry.type_uuid = uuid.UUID(type_uuid).bytes
+                    entry.type_uuid = type_uuid
                 else:
                     raise ImageError(f"Partition {part.name} has invalid type: {part.partition_type_uuid}")
         else:
-            entry.type_uuid = get_gpt_partition_type('L').bytes
+            entry.type_uuid = get_gpt_partition_type_bytes('L')
 
         # Set partition UUID
         if part.partition_uuid:
             try:
-                entry.uuid = uuid.UUID(part.partition_uuid).bytes
+                entry.uuid = uuid.UUID(part.partition_uuid).bytes_le
             except ValueError:
                 raise ImageError(f"Partition {part.name} has invalid UUID: {part.partition_uuid}")
         else:
-            entry.uuid = uuid.uuid4().bytes
+            entry.uuid = random_guid_bytes()
 
         # Set LBA range
         entry.first_lba = part.offset // 512
@@ -552,7 +555,7 @@ class HdImageHandler(ComImageHandler):
         # Create GPT header
         gpt_location = self.gpt_location
         header = GptHeader()
-        header.disk_uuid = uuid.UUID(self.disk_uuid).bytes
+        header.disk_uuid = uuid.UUID(self.disk_uuid).bytes_le
         header.backup_lba = (image.size // 512) - 1 if not self.gpt_no_backup else 1
         header.last_usable_lba = (image.size // 512) - 1 - GPT_SECTORS
         header.starting_lba = gpt_location // 512
@@ -565,11 +568,8 @@ class HdImageHandler(ComImageHandler):
             smallest_offset = gpt_location + (GPT_SECTORS - 1) * 512
         header.first_usable_lba = smallest_offset // 512
 
-        # Build partition table
-        table_data = self._build_gpt_table(gpt_entries)
-
-        # Calculate partition table CRC
-        header.table_crc = zlib.crc32(table_data) & 0xFFFFFFFF
+        # Build partition table and its CRC
+        table_data, header.table_crc = self._build_gpt_table(gpt_entries)
 
         # Calculate header CRC and write
         header_bytes = header.to_bytes()
@@ -1,17 +1,26 @@
 #!/usr/bin/env python3
+import array
 import logging
+import mmap
 import os
 import struct
+import sys
 from typing import Dict, List, Optional, Any
-from .common import ImageHandler, Image, ImageError, run_command, Partition, prepare_image, mountpath, get_tool_path
+from .common import ImageHandler, Image, ImageError, run_command, Partition, prepare_image, mountpath, get_tool_path, parse_size
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# BIOS Parameter Block fields from offset 11 up to BPB_FATSz32 (offset 36)
+_BPB = struct.Struct('<HBHBHHBHHHIII')
+
+# Minimization is skipped when it would save less than this many bytes
+TRUNCATE_MIN_DELTA = 64 * 1024
+
 class VFatHandler(ImageHandler):
     """VFAT filesystem handler"""
     type = "vfat"
-    opts = ["extraargs", "label", "files", "minimize"]
+    opts = ["extraargs", "label", "files", "minimize", "minimize_threshold"]
 
     def __init__(self):
         self.config = {}
@@ -34,20 +43,30 @@ class VFatHandler(ImageHandler):
         extraargs = self.config.get("extraargs", "")
         label = self.config.get("label", "")
         minimize = self.config.get("minimize", False)
+        minimize_threshold = self.config.get("minimize_threshold", TRUNCATE_MIN_DELTA)
+        if isinstance(minimize_threshold, str):
+            minimize_threshold = parse_size(minimize_threshold)
 
-        # Build label argument
-        label_arg = f"-n {label}" if label else ""
+        mmd = get_tool_path("mmd")
+        mcopy = get_tool_path("mcopy")
+        # Shared by every mtools invocation below. The image was just
+        # created by mkdosfs, so mtools' sanity checks can be skipped.
+        env = os.environ.copy()
+        env["MTOOLS_SKIP_CHECK"] = "1"
 
         # Execute mkdosfs to create vfat filesystem
-        cmd = [get_tool_path("mkdosfs"), *extraargs.split(), *label_arg.split(), image.outfile]
-        # Filter empty string arguments
-        cmd = [arg for arg in cmd if arg]
-        
+        cmd = [get_tool_path("mkdosfs"), *extraargs.split()]
+        if label:
+            cmd += ["-n", label]
+        cmd.append(image.outfile)
+
         # Check if formatting was successful
         if run_command(cmd) != 0:
             raise ImageError(f"Failed to create VFAT filesystem on {image.outfile}")
 
-        # Process files in partitions
+        # Process files in partitions. Sources that keep their own name are
+        # grouped per destination directory so each directory costs one mcopy.
+        batches: Dict[str, List[str]] = {}
         for part in image.partitions:
             child_image = self._get_child_image(image, part.image)
             if not child_image:
@@ -55,34 +74,47 @@ class VFatHandler(ImageHandler):
 
             src_path = child_image.outfile
             target = part.name or os.path.basename(src_path)
+            dir_path = os.path.dirname(target)
 
             # Create target directory (if there are subdirectories)
-            if '/' in target:
-                dir_path = os.path.dirname(target)
-                mmd_cmd = [get_tool_path("mmd"), "-DsS", "-i", image.outfile, f"::{dir_path}"]
-                env = os.environ.copy()
+            if dir_path and dir_path not in batches:
+                mmd_cmd = [mmd, "-DsS", "-i", image.outfile, f"::{dir_path}"]
                 if run_command(mmd_cmd, env=env) != 0:
                     raise ImageError(f"Failed to create directory '::{dir_path}' in VFAT image")
+                batches[dir_path] = []
+
+            if os.path.basename(target) == os.path.basename(src_path):
+                batches.setdefault(dir_path, []).append(src_path)
+                continue
+
+            # Renamed targets need their own mcopy
+            mcopy_cmd = [mcopy, "-spb", "-i", image.outfile, src_path, f"::{target}"]
 
-            # Copy files to vfat image
-            mcopy_cmd = [get_tool_path("mcopy"), "-sp", "-i", image.outfile, src_path, f"::{target}"]
-            env = os.environ.copy()
-            
             # Check if copy was successful (will fail if image is too small)
             if run_command(mcopy_cmd, env=env) != 0:
                 raise ImageError(f"Failed to copy '{src_path}' to VFAT image. The image size may be too small.")
 
+        # All copies target the same image and update the same FAT, so they
+        # stay sequential; running them concurrently would only contend on
+        # the mtools image lock.
+        for dir_path, srcs in batches.items():
+            if not srcs:
+                continue
+            mcopy_cmd = [mcopy, "-spb", "-i", image.outfile, *srcs, f"::{dir_path}"]
+            if run_command(mcopy_cmd, env=env) != 0:
+                raise ImageError(f"Failed to copy {srcs} to VFAT image. The image size may be too small.")
+
         # If not empty image and no partitions, copy files from mountpath
         if not image.empty and not image.partitions:
             mpath = mountpath(image)
-            if os.path.exists(mpath):
-                files = os.listdir(mpath)
-                for file in files:
-                    src_file = os.path.join(mpath, file)
-                    mcopy_cmd = [get_tool_path("mcopy"), "-sp", "-i", image.outfile, src_file, "::"]
-                    env = os.environ.copy()
+            if mpath and os.path.exists(mpath):
+                # scandir entries already carry the joined path
+                with os.scandir(mpath) as it:
+                    srcs = [entry.path for entry in it]
+                if srcs:
+                    mcopy_cmd = [mcopy, "-spb", "-i", image.outfile, *srcs, "::"]
                     if run_command(mcopy_cmd, env=env) != 0:
-                        raise ImageError(f"Failed to copy '{file}' from mountpath to VFAT image.")
+                        raise ImageError(f"Failed to copy files from '{mpath}' to VFAT image.")
 
         # Handle image minimization
         if minimize:
@@ -93,10 +125,9 @@ class VFatHandler(ImageHandler):
             # Get current file size
             current_size = os.stat(image.outfile).st_size
 
-            # Truncate file to minimum necessary size
-            if last_pos < current_size:
-                with open(image.outfile, 'r+b') as f:
-                    f.truncate(last_pos)
+            # Truncate file to minimum necessary size, unless the saving is negligible
+            if current_size - last_pos >= max(minimize_threshold, 1):
+                os.truncate(image.outfile, last_pos)
                 image.size = last_pos
                 logger.info(f"minimize image size to {last_pos} bytes 0x{last_pos:0x}")
 
@@ -112,15 +143,11 @@ class VFatHandler(ImageHandler):
                 current_file_size = os.fstat(f.fileno()).st_size
                 
                 # --- Read Boot Sector Key Fields ---
-                f.seek(11); bytes_per_sector = struct.unpack('<H', f.read(2))[0]
-                f.seek(13); sectors_per_cluster = struct.unpack('<B', f.read(1))[0] 
-                f.seek(14); reserved_sectors = struct.unpack('<H', f.read(2))[0]
-                f.seek(16); num_fats = struct.unpack('<B', f.read(1))[0] 
-                f.seek(17); root_entry_count = struct.unpack('<H', f.read(2))[0]
-                f.seek(19); total_sectors_16 = struct.unpack('<H', f.read(2))[0]
-                f.seek(22); sectors_per_fat_16 = struct.unpack('<H', f.read(2))[0]
-                f.seek(32); total_sectors_32 = struct.unpack('<I', f.read(4))[0]
-                f.seek(36); sectors_per_fat_32 = struct.unpack('<I', f.read(4))[0]
+                bpb = f.read(_BPB.size + 11)
+                (bytes_per_sector, sectors_per_cluster, reserved_sectors, num_fats,
+                 root_entry_count, total_sectors_16, _media, sectors_per_fat_16,
+                 _sectors_per_track, _num_heads, _hidden_sectors,
+                 total_sectors_32, sectors_per_fat_32) = _BPB.unpack_from(bpb, 11)
 
                 # --- 1. Determine FAT Sector Size (Handle corrupt FAT32 field) ---
                 sectors_per_fat = 0
@@ -151,61 +178,75 @@ class VFatHandler(ImageHandler):
                     raise ImageError(f"Calculated total FAT region size ({total_fat_region_size}) exceeds image size ({current_file_size}). Cannot minimize.")
                 
                 # --- 2. Determine FAT Type (FAT Type Detection) ---
-                total_sectors = total_sectors_32 if total_sectors_32 != 0 else total_sectors_16
-                if total_sectors == 0:
-                    raise ImageError("Total sectors count is zero or invalid.")
-
-                root_dir_sectors = (root_entry_count * 32 + bytes_per_sector - 1) // bytes_per_sector
-                data_sectors = total_sectors - (reserved_sectors + num_fats * sectors_per_fat + root_dir_sectors)
-                total_clusters = data_sectors // sectors_per_cluster if sectors_per_cluster != 0 else 0
-                
+                # Only FAT32 leaves BPB_FATSz16 at zero, so it is identified directly from the BPB.
                 fat_type = "FAT32"
                 entry_bytes = 4
                 mask = 0x0FFFFFFF
-                
+
                 # FAT32 cluster value check: it is valid as long as it's not 0x00000000 (free) AND less than 0x0FFFFFF8 (end of chain).
-                is_used = lambda entry: entry != 0x00000000 and entry < 0x0FFFFFF8
-                
-                if total_clusters < 4085:
-                    # Theoretically FAT12, but we treat it as unsupported
-                    raise ImageError("FAT12 not supported for minimization.")
-                elif total_clusters < 65525:
+                # Used entries are kept as a half-open range [used_min, used_end) so the scan can compare inline.
+                used_min, used_end = 0x00000001, 0x0FFFFFF8
+
+                if sectors_per_fat_16 != 0:
+                    # FAT12 and FAT16 are told apart by the cluster count
+                    total_sectors = total_sectors_32 if total_sectors_32 != 0 else total_sectors_16
+                    if total_sectors == 0:
+                        raise ImageError("Total sectors count is zero or invalid.")
+
+                    root_dir_sectors = (root_entry_count * 32 + bytes_per_sector - 1) // bytes_per_sector
+                    data_sectors = total_sectors - (reserved_sectors + num_fats * sectors_per_fat + root_dir_sectors)
+                    total_clusters = data_sectors // sectors_per_cluster if sectors_per_cluster != 0 else 0
+
+                    if total_clusters < 4085:
+                        # Theoretically FAT12, but we treat it as unsupported
+                        raise ImageError("FAT12 not supported for minimization.")
+
                     # FAT16
                     fat_type = "FAT16"
                     entry_bytes = 2
                     mask = 0xFFFF
                     # FAT16 cluster value check: it is considered an allocated or used cluster, including the end-of-chain marker (0xFFF8-0xFFFF), as long as it's not 0x0000 (free) OR 0x0001 (reserved).
-                    is_used = lambda entry: entry >= 0x0002
+                    used_min, used_end = 0x0002, 0x10000
 
-                logger.debug(f"DEBUG: Detected FAT Type: {fat_type} (Total Clusters: {total_clusters})")
+                logger.debug(f"DEBUG: Detected FAT Type: {fat_type}")
 
                 # --- 3. Calculate Offsets and Iterate (FAT Iteration) ---
                 data_region_offset = total_fat_region_size
                 cluster_size_bytes = sectors_per_cluster * bytes_per_sector
                 fat_offset = reserved_sectors * bytes_per_sector
                 
-                num_entries = fat_size_bytes // entry_bytes 
-                last_used_cluster = 0
-                
-                # Iterate through the FAT table to find the last used cluster (starting from cluster 2)
-                for cluster in range(2, num_entries):
-                    read_offset = fat_offset + cluster * entry_bytes
-                    
-                    f.seek(read_offset) 
-                    buffer = f.read(entry_bytes)
-                    
-                    if len(buffer) < entry_bytes:
-                        break 
-                    
-                    # Unpack based on detected FAT type
-                    if fat_type == "FAT16":
-                        fat_entry = struct.unpack('<H', buffer)[0]
-                    elif fat_type == "FAT32":
-                        fat_entry = struct.unpack('<I', buffer)[0] & mask
-                    
-                    # Check for valid used cluster entry
-                    if is_used(fat_entry):
-                        last_used_cluster = cluster
+                # Nothing is copied into an empty image, so there is no FAT to scan:
+                # keep the root directory and the first data cluster.
+                if image.empty and not image.partitions:
+                    root_dir_sectors = (root_entry_count * 32 + bytes_per_sector - 1) // bytes_per_sector
+                    return data_region_offset + root_dir_sectors * bytes_per_sector + cluster_size_bytes
+
+                # Map the first FAT and view it in place as an array of entries
+                fat_end = fat_offset + fat_size_bytes
+                fat_end -= fat_size_bytes % entry_bytes
+                typecode = 'H' if fat_type == "FAT16" else 'I'
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if sys.byteorder == 'little':
+                        fat = memoryview(mm)[fat_offset:fat_end].cast(typecode)
+                    else:
+                        fat = array.array(typecode, mm[fat_offset:fat_end])
+                        fat.byteswap()
+
+                    last_used_cluster = 0
+
+                    try:
+                        # Walk the FAT table backwards and stop at the last used cluster (down to cluster 2)
+                        for cluster in range(len(fat) - 1, 1, -1):
+                            fat_entry = fat[cluster] & mask
+
+                            # Check for valid used cluster entry
+                            if used_min <= fat_entry < used_end:
+                                last_used_cluster = cluster
+                                break
+                    finally:
+                        # The view must be gone before the mapping is closed
+                        if isinstance(fat, memoryview):
+                            fat.release()
 
                 if last_used_cluster == 0:
                     return -1
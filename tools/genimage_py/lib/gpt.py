@@ -1,5 +1,8 @@
 
+import os
 import struct
+import types
+import uuid
 import zlib
 from dataclasses import dataclass
 from typing import List, Dict, Any, Optional, Tuple, Iterable
@@ -21,7 +24,15 @@ TYPE_HYBRID = TYPE_MBR | TYPE_GPT
 
 PARTITION_TYPE_EXTENDED = 0x0f
 
-GPT_PARTITION_TYPES = {
+# MBR partition entry: boot flag, first CHS, type, last CHS, start LBA, sector count
+_MBR_ENTRY_ST = struct.Struct('<B3sB3sII')
+# GPT partition entry: type GUID, unique GUID, first/last LBA, flags, UTF-16LE name
+_GPT_ENTRY_ST = struct.Struct('<16s16sQQQ36H')
+# GPT header up to and including the partition array CRC (92 bytes)
+_GPT_HDR_ST = struct.Struct('<8sIIIIQQQQ16sQIII')
+_U32_ST = struct.Struct('<I')
+
+_GPT_PARTITION_TYPES = {
     # Basic types
     "L": "0fc63daf-8483-4772-8e79-3d69d8477de4",
     "linux": "0fc63daf-8483-4772-8e79-3d69d8477de4",
@@ -185,18 +196,14 @@ GPT_PARTITION_TYPES = {
     "usr-s390x-verity-sig": "31741cc4-1a2a-4111-a581-e00b447d2d06",
     "usr-tilegx-verity-sig": "2fb4bf56-07fa-42da-8132-6b139f2026ae",
     "usr-x86-64-verity-sig": "77ff5f63-e7b6-4633-acf4-1565b864c0e6",
-    "usr-x86-verity-sig": "8f461b0d-14ee-4e81-9aa9-049b6fb97abd",
-
-    # Special partitions
-    "esp": "c12a7328-f81f-11d2-ba4b-00a0c93ec93b",
-    "xbootldr": "bc13c2ff-59e6-4262-a352-b275fd6f7172",
-    "srv": "3b8f8425-20e0-4f3b-907f-1a25a76f98e8",
-    "var": "4d21b016-b534-45c2-a9fb-5c16e091fd2d",
-    "tmp": "7ec6f557-3bc5-4aca-b293-16ef5df639d1",
-    "user-home": "773f91ef-66d4-49b5-bd83-d683bf40ad16",
-    "linux-generic": "0fc63daf-8483-4772-8e79-3d69d8477de4"
+    "usr-x86-verity-sig": "8f461b0d-14ee-4e81-9aa9-049b6fb97abd"
 }
 
+# Lookups are case-insensitive: keys are stored upper-cased
+GPT_PARTITION_TYPES = types.MappingProxyType(
+    {k.upper(): v for k, v in _GPT_PARTITION_TYPES.items()}
+)
+
 @dataclass
 class MbrPartitionEntry:
     """MBR partition table entry structure"""
@@ -214,14 +221,14 @@ class MbrPartitionEntry:
             self.last_chs = [0, 0, 0]
 
     def to_bytes(self) -> bytes:
-        byte_data = bytearray(16)
-        byte_data[0] = self.boot
-        byte_data[1:4] = bytes(self.first_chs)
-        byte_data[4] = self.partition_type
-        byte_data[5:8] = bytes(self.last_chs)
-        byte_data[8:12] = struct.pack('<I', self.relative_sectors)
-        byte_data[12:16] = struct.pack('<I', self.total_sectors)
-        return byte_data
+        return _MBR_ENTRY_ST.pack(
+            self.boot,
+            bytes(self.first_chs),
+            self.partition_type,
+            bytes(self.last_chs),
+            self.relative_sectors,
+            self.total_sectors,
+        )
 
 @dataclass
 class GptPartitionEntry:
@@ -242,15 +249,27 @@ class GptPartitionEntry:
             self.uuid = b'\x00' * 16
 
     def to_bytes(self) -> bytes:
-        entry_bytes = bytearray(128)
-        entry_bytes[0:16] = self.type_uuid
-        entry_bytes[16:32] = self.uuid
-        struct.pack_into('<Q', entry_bytes, 32, self.first_lba)
-        struct.pack_into('<Q', entry_bytes, 40, self.last_lba)
-        struct.pack_into('<Q', entry_bytes, 48, self.flags)
-        for i in range(36):
-            struct.pack_into('H', entry_bytes, 56 + i * 2, self.name[i])
-        return entry_bytes
+        return _GPT_ENTRY_ST.pack(
+            self.type_uuid,
+            self.uuid,
+            self.first_lba,
+            self.last_lba,
+            self.flags,
+            *self.name,
+        )
+
+    def pack_into(self, buffer: bytearray, offset: int) -> None:
+        """Pack the entry into a zero-filled buffer at offset"""
+        _GPT_ENTRY_ST.pack_into(
+            buffer,
+            offset,
+            self.type_uuid,
+            self.uuid,
+            self.first_lba,
+            self.last_lba,
+            self.flags,
+            *self.name,
+        )
 
 
 @dataclass
@@ -273,30 +292,51 @@ class GptHeader:
 
     def __post_init__(self):
         if not self.disk_uuid:
-            self.disk_uuid = uuid.uuid4().bytes
+            self.disk_uuid = random_guid_bytes()
 
     def to_bytes(self) -> bytes:
-        header_bytes = bytearray(92)
-        header_bytes[0:8] = self.signature
-        struct.pack_into('<I', header_bytes, 8, self.revision)
-        struct.pack_into('<I', header_bytes, 12, self.header_size)
-        struct.pack_into('<I', header_bytes, 16, self.header_crc)
-        struct.pack_into('<I', header_bytes, 20, self.reserved)
-        struct.pack_into('<Q', header_bytes, 24, self.current_lba)
-        struct.pack_into('<Q', header_bytes, 32, self.backup_lba)
-        struct.pack_into('<Q', header_bytes, 40, self.first_usable_lba)
-        struct.pack_into('<Q', header_bytes, 48, self.last_usable_lba)
-        header_bytes[56:72] = self.disk_uuid
-        struct.pack_into('<Q', header_bytes, 72, self.starting_lba)
-        struct.pack_into('<I', header_bytes, 80, self.number_entries)
-        struct.pack_into('<I', header_bytes, 84, self.entry_size)
-        struct.pack_into('<I', header_bytes, 88, self.table_crc)
+        header_bytes = bytearray(_GPT_HDR_ST.size)
+        # The header CRC is computed with its own field zeroed
+        _GPT_HDR_ST.pack_into(
+            header_bytes, 0,
+            self.signature,
+            self.revision,
+            self.header_size,
+            0,
+            self.reserved,
+            self.current_lba,
+            self.backup_lba,
+            self.first_usable_lba,
+            self.last_usable_lba,
+            self.disk_uuid,
+            self.starting_lba,
+            self.number_entries,
+            self.entry_size,
+            self.table_crc,
+        )
 
         self.header_crc = zlib.crc32(header_bytes) & 0xFFFFFFFF
-        struct.pack_into('<I', header_bytes, 16, self.header_crc)
+        _U32_ST.pack_into(header_bytes, 16, self.header_crc)
 
         return header_bytes
 
+# Partition type GUIDs in on-disk (mixed-endian) form, parsed once at import
+_GPT_PARTITION_TYPES_BYTES = {
+    k: uuid.UUID(v).bytes_le for k, v in GPT_PARTITION_TYPES.items()
+}
+
+def random_guid_bytes() -> bytes:
+    """Generate a random (version 4) GUID in on-disk (mixed-endian) form"""
+    guid = bytearray(os.urandom(16))
+    # Version lives in the high nibble of the little-endian time_hi field
+    guid[7] = (guid[7] & 0x0F) | 0x40
+    guid[8] = (guid[8] & 0x3F) | 0x80
+    return bytes(guid)
+
 def get_gpt_partition_type(shortcut: str) -> Optional[str]:
     """Look up GPT partition type UUID"""
     return GPT_PARTITION_TYPES.get(shortcut.upper())
+
+def get_gpt_partition_type_bytes(shortcut: str) -> Optional[bytes]:
+    """Look up GPT partition type GUID as the 16 bytes stored in a partition entry"""
+    return _GPT_PARTITION_TYPES_BYTES.get(shortcut.upper())
@@ -1,10 +1,13 @@
 import struct
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import os
 from typing import List, Optional
 
 TOC_ENTRY_ALIGN = (64)
 
+# name (NUL-terminated, 31 chars max), offset, size, load, boot
+_TOC_ST = struct.Struct("<32sQQBB")
+
 @dataclass
 class TocInsertData:
     """TOC insert data structure"""
@@ -13,15 +16,21 @@ class TocInsertData:
     partition_size: int = 0
     load: int = 0
     boot: int = 0
+    _encoded_name: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _name_bytes: bytes = field(default=b"", init=False, repr=False, compare=False)
+
+    @property
+    def name_bytes(self) -> bytes:
+        """UTF-8 encoded partition name, cached until partition_name changes"""
+        if self._encoded_name is not self.partition_name:
+            self._name_bytes = self.partition_name.encode("utf-8")[:31]
+            self._encoded_name = self.partition_name
+        return self._name_bytes
 
     def to_bytes(self) -> bytes:
         """Convert the data structure to a byte array"""
-        fmt = "<32sQQBB"
-
-        name_bytes = self.partition_name.encode("utf-8")[:31].ljust(32, b'\x00')
-        data = struct.pack(
-            fmt,
-            name_bytes,
+        data = _TOC_ST.pack(
+            self.name_bytes,
             self.partition_offset,
             self.partition_size,
             self.load,
@@ -30,6 +39,18 @@ class TocInsertData:
 
         return data.ljust(TOC_ENTRY_ALIGN, b'\x00')
 
+    def pack_into(self, buffer: bytearray, offset: int) -> None:
+        """Pack the entry into a zero-filled buffer at offset"""
+        _TOC_ST.pack_into(
+            buffer,
+            offset,
+            self.name_bytes,
+            self.partition_offset,
+            self.partition_size,
+            self.load,
+            self.boot,
+        )
+
 class Toc:
     def __init__(self, toc_offset: int):
         self.entries_num : int = 0
@@ -49,9 +70,9 @@ class Toc:
         if not self.entries_num:
             raise ValueError("No TOC entries!")
 
-        toc_data = bytearray()
+        toc_data = bytearray(len(self.toc_entries) * TOC_ENTRY_ALIGN)
 
-        for entry in self.toc_entries:
-            toc_data += entry.to_bytes()
+        for i, entry in enumerate(self.toc_entries):
+            entry.pack_into(toc_data, i * TOC_ENTRY_ALIGN)
 
         return toc_data
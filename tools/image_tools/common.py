@@ -2,8 +2,9 @@ from __future__ import annotations
 
 import os
 import sys
+import array
+import functools
 import re
-import io
 import tempfile
 
 from pathlib import Path
@@ -47,6 +48,16 @@ def generate_temp_file_path(prefix, suffix) -> str:
 
     return str(random_path)
 
+@functools.lru_cache(maxsize=16)
+def _get_firmware_generator(img_config: FirmwareConfig) -> FirmwareGenerator:
+    """Build a generator once per configuration.
+
+    FirmwareConfig.from_file_for_encryption_with_iv_policy already returns
+    the cached instance until the config or a key file it references
+    changes, so keying on the config reuses the parsed keys and headers.
+    """
+    return FirmwareGenerator(img_config)
+
 def generate_k230_image(
     input_file,
     output_file,
@@ -78,8 +89,9 @@ def generate_k230_image(
         img_config = FirmwareConfig()
         img_config.validate_for_encryption(encrypt_type)
 
+    img_generator = _get_firmware_generator(img_config)
+
     try:
-        img_generator = FirmwareGenerator(img_config)
         img_generator.generate_firmware(input_file, output_file, encrypt_type)
 
         return True
@@ -201,6 +213,12 @@ def get_validated_env_path(env_var_name: str) -> str:
     # Return the validated, absolute path
     return abs_path
 
+# Characters allowed in a Kconfig symbol name after the CONFIG_ prefix
+KCONFIG_SYMBOL_CHARS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_'
+
+# Regex to match lines that are explicitly NOT set (e.g., comments like "# CONFIG_XXX is not set")
+UNSET_LINE_RE = re.compile(r'^#\s*(CONFIG_[A-Z0-9_]+)\s+is\s+not\s+set')
+
 def parse_kconfig(config_file_path: str) -> Dict[str, Any]:
     """
     Parses a Kconfig .config file, expands environment variables in
@@ -216,36 +234,41 @@ def parse_kconfig(config_file_path: str) -> Dict[str, Any]:
         dict: A dictionary of CONFIG_SYMBOL -> expanded_value (bool or str).
     """
     config_data = {}
-
-    # Regex to match lines like: CONFIG_SYMBOL="value" or CONFIG_SYMBOL=y/n/hex/int
-    # Group 1: CONFIG_SYMBOL
-    # Group 2: The entire value part (e.g., "value" or y)
-    CONFIG_LINE_RE = re.compile(r'^(CONFIG_[A-Z0-9_]+)=(.*)')
-
-    # Regex to match lines that are explicitly NOT set (e.g., comments like "# CONFIG_XXX is not set")
-    UNSET_LINE_RE = re.compile(r'^#\s*(CONFIG_[A-Z0-9_]+)\s+is\s+not\s+set')
+    expanded_cache: Dict[str, str] = {}
+    # Interned keys let lookups with literal 'CONFIG_*' names match by identity
+    intern = sys.intern
 
     try:
         with open(config_file_path, 'r') as f:
             for line in f:
                 line = line.strip()
 
-                # --- 1. Handle Unset/Negative Configuration (Implicit 'n' or False) ---
-                unset_match = UNSET_LINE_RE.match(line)
-                if unset_match:
-                    symbol = unset_match.group(1)
-                    config_data[symbol] = False
+                # Ignore blank lines
+                if not line:
                     continue
 
-                # Ignore general comments and blank lines after unset check
-                if not line or line.startswith('#'):
+                # --- 1. Handle Unset/Negative Configuration (Implicit 'n' or False) ---
+                if line[0] == '#':
+                    # Fast path for the canonical "# CONFIG_XXX is not set" form
+                    if line.startswith('# CONFIG_') and line.endswith(' is not set'):
+                        symbol = line[2:-11]
+                        if len(symbol) > 7 and not symbol.strip(KCONFIG_SYMBOL_CHARS):
+                            config_data[intern(symbol)] = False
+                            continue
+
+                    # Other spacings still go through the regex; anything else is a comment
+                    if 'CONFIG_' in line:
+                        unset_match = UNSET_LINE_RE.match(line)
+                        if unset_match:
+                            config_data[intern(unset_match.group(1))] = False
                     continue
 
                 # --- 2. Handle Set Configuration ---
-                match = CONFIG_LINE_RE.match(line)
-                if match:
-                    symbol = match.group(1)
-                    value_raw = match.group(2)
+                # Same as matching ^(CONFIG_[A-Z0-9_]+)=(.*), without the regex
+                if line.startswith('CONFIG_'):
+                    symbol, sep, value_raw = line.partition('=')
+                    if not sep or len(symbol) <= 7 or symbol.strip(KCONFIG_SYMBOL_CHARS):
+                        continue
 
                     # 2a. Strip quotes if present (Kconfig often quotes strings)
                     if value_raw.startswith('"') and value_raw.endswith('"'):
@@ -254,7 +277,14 @@ def parse_kconfig(config_file_path: str) -> Dict[str, Any]:
                         value_processed = value_raw
 
                     # 2b. Expand environment variables (Handles ${VAR} and $VAR)
-                    expanded_value = os.path.expandvars(value_processed)
+                    # Only values that reference a variable need expanding; repeats are cached.
+                    if '$' in value_processed or '%' in value_processed:
+                        expanded_value = expanded_cache.get(value_processed)
+                        if expanded_value is None:
+                            expanded_value = os.path.expandvars(value_processed)
+                            expanded_cache[value_processed] = expanded_value
+                    else:
+                        expanded_value = value_processed
 
                     # 2c. Apply Type Conversion Logic
 
@@ -265,7 +295,7 @@ def parse_kconfig(config_file_path: str) -> Dict[str, Any]:
                     else:
                         final_value = expanded_value
 
-                    config_data[symbol] = final_value
+                    config_data[intern(symbol)] = final_value
 
     except FileNotFoundError:
         print(f"Error: Config file not found at {config_file_path}")
@@ -298,13 +328,16 @@ def swap_chunk(chunk_orig):
 
     # Perform the 32-bit (4-byte) endianness swap:
     # [0, 1, 2, 3] becomes [3, 2, 1, 0] for every 4-byte group.
-    # [start:end:step] slicing is used for efficiency.
-    chunk[0::4], chunk[1::4], chunk[2::4], chunk[3::4] = \
-        chunk[3::4], chunk[2::4], chunk[1::4], chunk[0::4]
+    # array.byteswap() does the whole chunk in a single C loop.
+    words = array.array('I', chunk)
+    words.byteswap()
+
+    return bytearray(words)
 
-    return chunk
+# Firmware blobs are several MiB; large chunks keep the syscall count low
+SWAP_CHUNK_SIZE = 1024 * 1024
 
-def swap_bytes_in_file(input_path, output_path, chunk_size=io.DEFAULT_BUFFER_SIZE):
+def swap_bytes_in_file(input_path, output_path, chunk_size=SWAP_CHUNK_SIZE):
     """
     Reads an input binary file, swaps the byte order (32-bit), 
     and writes the result to an output file.
@@ -314,19 +347,43 @@ def swap_bytes_in_file(input_path, output_path, chunk_size=io.DEFAULT_BUFFER_SIZ
         output_path (str): Path to the destination binary file.
         chunk_size (int): Size of the buffer to read at a time.
     """
+    # One word buffer is reused for every chunk; it is read into and
+    # swapped in place, so no per-chunk objects are allocated.
+    words = array.array('I', bytes(max(4, (chunk_size + 3) // 4 * 4)))
+    buf = memoryview(words).cast('B')
+
     try:
-        with open(input_path, "rb") as input_bin:
-            with open(output_path, "wb") as output_bin:
+        with open(input_path, "rb", buffering=0) as input_bin:
+            # The file is read front to back exactly once
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(input_bin.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+            with open(output_path, "wb", buffering=0) as output_bin:
                 while True:
-                    # Read up to chunk_size bytes
-                    chunk = input_bin.read(chunk_size)
-                    
+                    # Fill the buffer (raw reads may return short)
+                    size = 0
+                    while size < len(buf):
+                        count = input_bin.readinto(buf[size:])
+                        if not count:
+                            break
+                        size += count
+
                     # Stop if we hit EOF
-                    if not chunk:
+                    if not size:
                         break
 
+                    # Align to 4 bytes and pad with 0x0
+                    padded = (size + 3) // 4 * 4
+                    buf[size:padded] = bytes(padded - size)
+
                     # Swap the chunk and write it out
-                    output_bin.write(swap_chunk(chunk))
+                    words.byteswap()
+                    written = 0
+                    while written < padded:
+                        written += output_bin.write(buf[written:padded])
+
+                    if size < len(buf):
+                        break
 
         # print(f"Successfully swapped bytes from {input_path} to {output_path}")
 
@@ -12,20 +12,25 @@ Refactored for better structure and maintainability.
 """
 
 import os
+import re
+import mmap
 import sys
 import struct
-import codecs
 import argparse
 import logging
 import json
 import secrets
+import shutil
+import functools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Tuple, Optional, Union, Dict, Any
+from typing import Tuple, Optional, Union, Dict, Any, Sequence, BinaryIO, ClassVar
 from dataclasses import dataclass, field
 
 # Cryptography libraries
 import hashlib
-import binascii
 from Crypto.Cipher import AES
 from Crypto.PublicKey import RSA
 from Crypto.Signature import pkcs1_15
@@ -35,9 +40,31 @@ from base64 import b64encode
 
 # Chinese cryptographic libraries
 from gmssl.sm4 import CryptSM4, SM4_ENCRYPT, SM4_DECRYPT
-from gmssl import sm2, func
+from gmssl import sm2
 from gmssl import sm3
 
+# Optional OpenSSL-backed AES-GCM; PyCryptodome is used when it is missing
+_aesgcm_available = True
+
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:
+    _aesgcm_available = False
+
+AES_GCM_TAG_LEN = 16
+
+# Optional OpenSSL-backed SM4; gmssl's pure-Python CBC loop is the fallback
+_sm4_cipher_available = True
+
+try:
+    from cryptography.hazmat.primitives import padding as sym_padding
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:
+    _sm4_cipher_available = False
+
+SM4_BLOCK_BITS = 128
+
 
 # ============================================================================
 # Configuration Loading
@@ -97,21 +124,33 @@ def select_stage_config(config_data: Dict[str, Any], config_path: str, section_n
     return config_data
 
 
-def hex_string_to_bytes(hex_str: str) -> bytes:
+# Escaped hex made only of complete bytes, e.g. \x00\x01\xff
+ESCAPED_HEX_RE = re.compile(r'(?:\\x[0-9A-Fa-f]{2})+')
+
+
+def hex_string_to_bytes(hex_str: Union[str, bytes, bytearray]) -> bytes:
     """Convert hex string to bytes
     
     Args:
-        hex_str: Hex string (with or without 0x prefix)
+        hex_str: Hex string (with or without 0x prefix); spaces and
+            underscores between digits are ignored. Raw bytes are
+            returned as-is.
         
     Returns:
         Bytes object
     """
+    if isinstance(hex_str, (bytes, bytearray)):
+        return bytes(hex_str)
+
     # Remove 0x prefix if present
-    if hex_str.startswith('0x'):
-        hex_str = hex_str[2:]
+    hex_str = hex_str.removeprefix('0x')
     
     # Handle escaped hex format like \x00\x01...
     if '\\x' in hex_str:
+        # Common case: every escape is a full byte, decode it in one C call
+        if ESCAPED_HEX_RE.fullmatch(hex_str):
+            return bytes.fromhex(hex_str.replace('\\x', ''))
+
         # Parse escaped hex format
         parts = hex_str.split('\\x')
         if parts[0] == '':
@@ -119,7 +158,7 @@ def hex_string_to_bytes(hex_str: str) -> bytes:
         return bytes(int(part, 16) for part in parts if part)
     
     # Handle regular hex string
-    return bytes.fromhex(hex_str)
+    return bytes.fromhex(hex_str.replace('_', ''))
 
 
 def bytes_to_hex_string(data: bytes) -> str:
@@ -326,48 +365,108 @@ def import_rsa_key_from_file(config_path: str, reference: str, require_private:
 
 
 def apply_rsa_key_material_from_file(
-    config: 'FirmwareConfig',
+    values: Dict[str, Any],
     rsa_config: Dict[str, Any],
     config_path: str,
 ) -> None:
     public_key_ref = parse_optional_reference(rsa_config, 'rsa', 'public_key_file')
     private_key_ref = parse_optional_reference(rsa_config, 'rsa', 'private_key_file')
 
+    for reference in (public_key_ref, private_key_ref):
+        if reference:
+            values['referenced_files'] = values.get('referenced_files', ()) + (
+                str(resolve_config_reference_path(config_path, reference)),
+            )
+
     public_key = import_rsa_key_from_file(config_path, public_key_ref, require_private=False) if public_key_ref else None
     private_key = import_rsa_key_from_file(config_path, private_key_ref, require_private=True) if private_key_ref else None
 
     if public_key is not None:
         file_modulus = public_key.n.to_bytes((public_key.n.bit_length() + 7) // 8, byteorder='big')
         file_exponent = hex(public_key.e)
-        if config.RSA_MODULUS is None:
-            config.RSA_MODULUS = file_modulus
-        elif config.RSA_MODULUS != file_modulus:
+        if values.get('RSA_MODULUS') is None:
+            values['RSA_MODULUS'] = file_modulus
+        elif values.get('RSA_MODULUS') != file_modulus:
             raise ValueError("Configured rsa.modulus does not match rsa.public_key_file")
-        if config.RSA_EXPONENT is None:
-            config.RSA_EXPONENT = file_exponent
-        elif int(config.RSA_EXPONENT, 0) != public_key.e:
+        if values.get('RSA_EXPONENT') is None:
+            values['RSA_EXPONENT'] = file_exponent
+        elif int(values.get('RSA_EXPONENT'), 0) != public_key.e:
             raise ValueError("Configured rsa.exponent does not match rsa.public_key_file")
-        if config.RSA_KEYSIZE is None:
-            config.RSA_KEYSIZE = public_key.n.bit_length()
+        if values.get('RSA_KEYSIZE') is None:
+            values['RSA_KEYSIZE'] = public_key.n.bit_length()
 
     if private_key is not None:
         file_modulus = private_key.n.to_bytes((private_key.n.bit_length() + 7) // 8, byteorder='big')
         file_exponent = hex(private_key.e)
         file_private_exponent = private_key.d.to_bytes((private_key.n.bit_length() + 7) // 8, byteorder='big')
-        if config.RSA_MODULUS is None:
-            config.RSA_MODULUS = file_modulus
-        elif config.RSA_MODULUS != file_modulus:
+        if values.get('RSA_MODULUS') is None:
+            values['RSA_MODULUS'] = file_modulus
+        elif values.get('RSA_MODULUS') != file_modulus:
             raise ValueError("Configured rsa.modulus does not match rsa.private_key_file")
-        if config.RSA_EXPONENT is None:
-            config.RSA_EXPONENT = file_exponent
-        elif int(config.RSA_EXPONENT, 0) != private_key.e:
+        if values.get('RSA_EXPONENT') is None:
+            values['RSA_EXPONENT'] = file_exponent
+        elif int(values.get('RSA_EXPONENT'), 0) != private_key.e:
             raise ValueError("Configured rsa.exponent does not match rsa.private_key_file")
-        if config.RSA_PRIVATE_EXPONENT is None:
-            config.RSA_PRIVATE_EXPONENT = file_private_exponent
-        elif config.RSA_PRIVATE_EXPONENT != file_private_exponent:
+        if values.get('RSA_PRIVATE_EXPONENT') is None:
+            values['RSA_PRIVATE_EXPONENT'] = file_private_exponent
+        elif values.get('RSA_PRIVATE_EXPONENT') != file_private_exponent:
             raise ValueError("Configured rsa.private_exponent does not match rsa.private_key_file")
-        if config.RSA_KEYSIZE is None:
-            config.RSA_KEYSIZE = private_key.n.bit_length()
+        if values.get('RSA_KEYSIZE') is None:
+            values['RSA_KEYSIZE'] = private_key.n.bit_length()
+
+
+# Parsed configs keyed by loader, arguments and config file identity
+CONFIG_CACHE_SIZE = 8
+_config_cache: 'OrderedDict[tuple, Tuple[FirmwareConfig, tuple]]' = OrderedDict()
+
+
+def file_identity(path: str) -> Tuple[str, int, int]:
+    st = os.stat(path)
+    return os.path.realpath(path), st.st_mtime_ns, st.st_size
+
+
+def cached_config_loader(loader):
+    """Memoize a FirmwareConfig loader on the identity of the config file
+
+    Entries are keyed on (realpath, mtime_ns, size) of the config and are
+    dropped when any key file it references changes. FirmwareConfig is
+    frozen, so callers share the cached instance.
+    """
+    @functools.wraps(loader)
+    def wrapper(cls, config_path: str, *args, **kwargs):
+        try:
+            identity = file_identity(config_path)
+        except OSError:
+            # Let the loader report the missing file
+            return loader(cls, config_path, *args, **kwargs)
+
+        # Relative key file references are resolved against these too
+        key = (
+            cls, loader.__name__, identity, args, tuple(sorted(kwargs.items())),
+            os.getenv("SDK_BOARD_DIR"), os.getenv("SDK_SRC_ROOT_DIR"), os.getcwd(),
+        )
+
+        cached = _config_cache.get(key)
+        if cached is not None:
+            config, referenced = cached
+            try:
+                fresh = tuple(file_identity(path) for path in config.referenced_files) == referenced
+            except OSError:
+                fresh = False
+            if fresh:
+                _config_cache.move_to_end(key)
+                logging.debug(f"Using cached configuration for: {config_path}")
+                return config
+
+        config = loader(cls, config_path, *args, **kwargs)
+        referenced = tuple(file_identity(path) for path in config.referenced_files)
+        _config_cache[key] = (config, referenced)
+        if len(_config_cache) > CONFIG_CACHE_SIZE:
+            _config_cache.popitem(last=False)
+
+        return config
+
+    return wrapper
 
 
 # ============================================================================
@@ -379,18 +478,24 @@ ROM_SM4_IV = b'\x00\x01\x02\x03\x04\x05\x06\x07\x08\x09\x0a\x0b\x0c\x0d\x0e\x0f'
 AES_GCM_IV_LEN = 12
 SM4_CBC_IV_LEN = 16
 
-@dataclass
+# Data length and encryption type following the magic. The boot ROM reads
+# little-endian words, whatever the byte order of the build host.
+FIRMWARE_PREAMBLE_ST = struct.Struct('<ii')
+# 32-bit header fields: RSA exponent and SM2 ID length
+INT32_ST = struct.Struct('<i')
+
+@dataclass(frozen=True, slots=True)
 class FirmwareConfig:
     """Configuration constants for firmware generation"""
 
     # Firmware format constants
-    MAGIC_BYTES: bytes = b'\x4b\x32\x33\x30'  # "K230"
-    HEADER_SIZE: int = 516
+    MAGIC_BYTES: ClassVar[bytes] = b'\x4b\x32\x33\x30'  # "K230"
+    HEADER_SIZE: ClassVar[int] = 516
     
     # Encryption type constants
-    ENCRYPTION_NONE: int = 0
-    ENCRYPTION_SM4: int = 1
-    ENCRYPTION_AES: int = 2
+    ENCRYPTION_NONE: ClassVar[int] = 0
+    ENCRYPTION_SM4: ClassVar[int] = 1
+    ENCRYPTION_AES: ClassVar[int] = 2
 
     # Firmware Version
     VERSION_BYTES: bytes = b'\x00\x00\x00\x00'
@@ -418,8 +523,12 @@ class FirmwareConfig:
     SM2_PUBLIC_KEY_Y: Optional[bytes] = None
     SM2_RANDOM_K: Optional[bytes] = None
     SM2_ID: Optional[bytes] = None
+
+    # Key files the configuration was read from, besides the JSON itself
+    referenced_files: Tuple[str, ...] = field(default=(), repr=False, compare=False)
     
     @classmethod
+    @cached_config_loader
     def from_file(cls, config_path: str, section_name: Optional[str] = None) -> 'FirmwareConfig':
         """Create FirmwareConfig from JSON file
         
@@ -431,43 +540,44 @@ class FirmwareConfig:
         """
         config_data = select_stage_config(load_config_from_file(config_path), config_path, section_name)
         
-        config = cls()
+        values: Dict[str, Any] = {}
 
         if 'firmware' in config_data:
             firmware_config = config_data['firmware']
             if 'version_bytes' in firmware_config:
-                config.VERSION_BYTES = hex_string_to_bytes(firmware_config['version_bytes'])
+                values['VERSION_BYTES'] = hex_string_to_bytes(firmware_config['version_bytes'])
         
         if 'aes' in config_data:
             aes_config = config_data['aes']
-            config.AES_IV = parse_optional_bytes(aes_config, 'aes', 'iv', default=None)
-            config.AES_KEY = parse_optional_bytes(aes_config, 'aes', 'key', default=None)
+            values['AES_IV'] = parse_optional_bytes(aes_config, 'aes', 'iv', default=None)
+            values['AES_KEY'] = parse_optional_bytes(aes_config, 'aes', 'key', default=None)
             auth_data = parse_optional_bytes(aes_config, 'aes', 'auth_data', default=b'')
-            config.AES_AUTH_DATA = auth_data if auth_data is not None else b''
+            values['AES_AUTH_DATA'] = auth_data if auth_data is not None else b''
         
         if 'rsa' in config_data:
             rsa_config = config_data['rsa']
-            config.RSA_KEYSIZE = parse_optional_int(rsa_config, 'rsa', 'key_size')
-            config.RSA_MODULUS = parse_optional_bytes(rsa_config, 'rsa', 'modulus', default=None)
+            values['RSA_KEYSIZE'] = parse_optional_int(rsa_config, 'rsa', 'key_size')
+            values['RSA_MODULUS'] = parse_optional_bytes(rsa_config, 'rsa', 'modulus', default=None)
             if 'exponent' in rsa_config:
-                config.RSA_EXPONENT = str(rsa_config['exponent'])
-            config.RSA_PRIVATE_EXPONENT = parse_optional_bytes(rsa_config, 'rsa', 'private_exponent', default=None)
-            apply_rsa_key_material_from_file(config, rsa_config, config_path)
+                values['RSA_EXPONENT'] = str(rsa_config['exponent'])
+            values['RSA_PRIVATE_EXPONENT'] = parse_optional_bytes(rsa_config, 'rsa', 'private_exponent', default=None)
+            apply_rsa_key_material_from_file(values, rsa_config, config_path)
         
         if 'sm4' in config_data:
             sm4_config = config_data['sm4']
-            config.SM4_KEY = parse_optional_bytes(sm4_config, 'sm4', 'key', default=None)
-            config.SM4_IV = parse_optional_bytes(sm4_config, 'sm4', 'iv', default=None)
+            values['SM4_KEY'] = parse_optional_bytes(sm4_config, 'sm4', 'key', default=None)
+            values['SM4_IV'] = parse_optional_bytes(sm4_config, 'sm4', 'iv', default=None)
         
         if 'sm2' in config_data:
             sm2_config = config_data['sm2']
-            config.SM2_PRIVATE_KEY = parse_optional_bytes(sm2_config, 'sm2', 'private_key', default=None)
-            config.SM2_PUBLIC_KEY_X = parse_optional_bytes(sm2_config, 'sm2', 'public_key_x', default=None)
-            config.SM2_PUBLIC_KEY_Y = parse_optional_bytes(sm2_config, 'sm2', 'public_key_y', default=None)
-            config.SM2_RANDOM_K = parse_optional_bytes(sm2_config, 'sm2', 'random_k', default=None)
+            values['SM2_PRIVATE_KEY'] = parse_optional_bytes(sm2_config, 'sm2', 'private_key', default=None)
+            values['SM2_PUBLIC_KEY_X'] = parse_optional_bytes(sm2_config, 'sm2', 'public_key_x', default=None)
+            values['SM2_PUBLIC_KEY_Y'] = parse_optional_bytes(sm2_config, 'sm2', 'public_key_y', default=None)
+            values['SM2_RANDOM_K'] = parse_optional_bytes(sm2_config, 'sm2', 'random_k', default=None)
             if 'id' in sm2_config:
-                config.SM2_ID = parse_required_string_or_hex(sm2_config, 'sm2', 'id')
+                values['SM2_ID'] = parse_required_string_or_hex(sm2_config, 'sm2', 'id')
         
+        config = cls(**values)
         logging.info("Configuration loaded and applied successfully")
         return config
 
@@ -486,6 +596,7 @@ class FirmwareConfig:
         )
 
     @classmethod
+    @cached_config_loader
     def from_file_for_encryption_with_iv_policy(
         cls,
         config_path: str,
@@ -494,20 +605,20 @@ class FirmwareConfig:
         section_name: Optional[str] = None,
     ) -> 'FirmwareConfig':
         config_data = select_stage_config(load_config_from_file(config_path), config_path, section_name)
-        config = cls()
+        values: Dict[str, Any] = {}
 
         if 'firmware' in config_data:
             firmware_config = require_dict(config_data, 'firmware')
             if 'version_bytes' in firmware_config:
-                config.VERSION_BYTES = parse_optional_bytes(firmware_config, 'firmware', 'version_bytes')
+                values['VERSION_BYTES'] = parse_optional_bytes(firmware_config, 'firmware', 'version_bytes')
 
         if encryption_type == cls.ENCRYPTION_AES:
             aes_config = require_dict(config_data, 'aes')
             rsa_config = require_dict(config_data, 'rsa')
-            config.AES_USE_EMBEDDED_IV = not use_rom_iv
+            values['AES_USE_EMBEDDED_IV'] = not use_rom_iv
 
             if use_rom_iv:
-                config.AES_IV = resolve_stage_iv_with_rom_policy(
+                values['AES_IV'] = resolve_stage_iv_with_rom_policy(
                     aes_config,
                     'aes',
                     'iv',
@@ -516,29 +627,29 @@ class FirmwareConfig:
                     section_name,
                 )
             else:
-                config.AES_IV = parse_optional_bytes(aes_config, 'aes', 'iv', default=None)
-            config.AES_KEY = parse_required_bytes(aes_config, 'aes', 'key')
+                values['AES_IV'] = parse_optional_bytes(aes_config, 'aes', 'iv', default=None)
+            values['AES_KEY'] = parse_required_bytes(aes_config, 'aes', 'key')
             auth_data = parse_optional_bytes(aes_config, 'aes', 'auth_data', default=b'')
-            config.AES_AUTH_DATA = auth_data if auth_data is not None else b''
+            values['AES_AUTH_DATA'] = auth_data if auth_data is not None else b''
 
-            config.RSA_KEYSIZE = parse_optional_int(rsa_config, 'rsa', 'key_size')
-            config.RSA_MODULUS = parse_optional_bytes(rsa_config, 'rsa', 'modulus', default=None)
+            values['RSA_KEYSIZE'] = parse_optional_int(rsa_config, 'rsa', 'key_size')
+            values['RSA_MODULUS'] = parse_optional_bytes(rsa_config, 'rsa', 'modulus', default=None)
             rsa_exponent_value = parse_optional_int(rsa_config, 'rsa', 'exponent')
             if rsa_exponent_value is not None:
                 if rsa_exponent_value <= 0 or rsa_exponent_value > 0xffffffff:
                     raise ValueError("Field 'rsa.exponent' must be in range 1..0xffffffff")
-                config.RSA_EXPONENT = hex(rsa_exponent_value)
-            config.RSA_PRIVATE_EXPONENT = parse_optional_bytes(rsa_config, 'rsa', 'private_exponent', default=None)
-            apply_rsa_key_material_from_file(config, rsa_config, config_path)
+                values['RSA_EXPONENT'] = hex(rsa_exponent_value)
+            values['RSA_PRIVATE_EXPONENT'] = parse_optional_bytes(rsa_config, 'rsa', 'private_exponent', default=None)
+            apply_rsa_key_material_from_file(values, rsa_config, config_path)
 
         elif encryption_type == cls.ENCRYPTION_SM4:
             sm4_config = require_dict(config_data, 'sm4')
             sm2_config = require_dict(config_data, 'sm2')
-            config.SM4_USE_EMBEDDED_IV = not use_rom_iv
+            values['SM4_USE_EMBEDDED_IV'] = not use_rom_iv
 
-            config.SM4_KEY = parse_required_bytes(sm4_config, 'sm4', 'key')
+            values['SM4_KEY'] = parse_required_bytes(sm4_config, 'sm4', 'key')
             if use_rom_iv:
-                config.SM4_IV = resolve_stage_iv_with_rom_policy(
+                values['SM4_IV'] = resolve_stage_iv_with_rom_policy(
                     sm4_config,
                     'sm4',
                     'iv',
@@ -547,14 +658,15 @@ class FirmwareConfig:
                     section_name,
                 )
             else:
-                config.SM4_IV = parse_optional_bytes(sm4_config, 'sm4', 'iv', default=None)
+                values['SM4_IV'] = parse_optional_bytes(sm4_config, 'sm4', 'iv', default=None)
 
-            config.SM2_PRIVATE_KEY = parse_required_bytes(sm2_config, 'sm2', 'private_key')
-            config.SM2_PUBLIC_KEY_X = parse_required_bytes(sm2_config, 'sm2', 'public_key_x')
-            config.SM2_PUBLIC_KEY_Y = parse_required_bytes(sm2_config, 'sm2', 'public_key_y')
-            config.SM2_RANDOM_K = parse_optional_bytes(sm2_config, 'sm2', 'random_k', default=None)
-            config.SM2_ID = parse_required_string_or_hex(sm2_config, 'sm2', 'id')
+            values['SM2_PRIVATE_KEY'] = parse_required_bytes(sm2_config, 'sm2', 'private_key')
+            values['SM2_PUBLIC_KEY_X'] = parse_required_bytes(sm2_config, 'sm2', 'public_key_x')
+            values['SM2_PUBLIC_KEY_Y'] = parse_required_bytes(sm2_config, 'sm2', 'public_key_y')
+            values['SM2_RANDOM_K'] = parse_optional_bytes(sm2_config, 'sm2', 'random_k', default=None)
+            values['SM2_ID'] = parse_required_string_or_hex(sm2_config, 'sm2', 'id')
 
+        config = cls(**values)
         config.validate_for_encryption(encryption_type)
         logging.info("Configuration loaded and validated successfully")
         return config
@@ -661,12 +773,26 @@ def setup_logging(verbose: bool = False) -> None:
     )
 
 
+def debug_enabled() -> bool:
+    """Whether debug messages are emitted; guards costly debug formatting"""
+    return logging.getLogger().isEnabledFor(logging.DEBUG)
+
+
 def format_hex_bytes(data: bytes, prefix: str = "") -> str:
     """Format bytes as hex string with proper formatting"""
-    hex_str = ''.join(f'\\x{byte:02x}' for byte in data)
+    hex_str = '\\x' + data.hex(' ').replace(' ', '\\x') if data else ''
     return f"{prefix}{hex_str}" if prefix else hex_str
 
 
+def format_hex_preview(data: bytes, prefix: str = "", edge: int = 32) -> str:
+    """Format bytes like format_hex_bytes, eliding the middle of large buffers"""
+    if len(data) <= 2 * edge:
+        return format_hex_bytes(data, prefix)
+
+    return (f"{format_hex_bytes(data[:edge], prefix)}..."
+            f"{format_hex_bytes(data[-edge:])} (len={len(data)})")
+
+
 def validate_file_exists(filepath: str) -> Path:
     """Validate that input file exists and return Path object"""
     path = Path(filepath)
@@ -682,6 +808,55 @@ def zeros(count: int) -> bytes:
     return b'\x00' * count
 
 
+def _openssl_has_sm3() -> bool:
+    try:
+        hashlib.new('sm3')
+    except ValueError:
+        return False
+    return True
+
+
+def _openssl_has_sm4() -> bool:
+    if not _sm4_cipher_available:
+        return False
+    try:
+        Cipher(algorithms.SM4(bytes(16)), modes.CBC(bytes(16))).encryptor()
+    except Exception:
+        # UnsupportedAlgorithm when OpenSSL is built without SM4
+        return False
+    return True
+
+
+# Prefer OpenSSL's SM3; gmssl's pure-Python SM3 works on a list of ints
+# and is far slower on firmware-sized inputs.
+if _openssl_has_sm3():
+    def sm3_digest(*parts: bytes) -> bytes:
+        """Return the SM3 digest of the concatenated parts"""
+        digest = hashlib.new('sm3')
+        for part in parts:
+            digest.update(part)
+        return digest.digest()
+else:
+    def sm3_digest(*parts: bytes) -> bytes:
+        """Return the SM3 digest of the concatenated parts"""
+        data = b''.join(parts)
+
+        # Feed gmssl's compression function 64-byte blocks straight from the
+        # buffer; sm3_hash() wants the whole message as a list of ints
+        bulk = len(data) - len(data) % 64
+        tail = data[bulk:] + b'\x80'
+        tail += bytes(-(len(tail) + 8) % 64) + (len(data) * 8).to_bytes(8, 'big')
+
+        state = sm3.IV
+        with memoryview(data) as view:
+            for offset in range(0, bulk, 64):
+                state = sm3.sm3_cf(state, view[offset:offset + 64])
+        for offset in range(0, len(tail), 64):
+            state = sm3.sm3_cf(state, tail[offset:offset + 64])
+
+        return b''.join(word.to_bytes(4, 'big') for word in state)
+
+
 def generate_sm2_nonce_hex(sm2_crypt: sm2.CryptSM2) -> str:
     curve_order = int(sm2_crypt.ecc_table['n'], 16)
     nonce = secrets.randbelow(curve_order - 1) + 1
@@ -689,6 +864,29 @@ def generate_sm2_nonce_hex(sm2_crypt: sm2.CryptSM2) -> str:
     return f"{nonce:0{sm2_crypt.para_len}x}"
 
 
+def copy_file_contents(src: BinaryIO, dst: BinaryIO) -> None:
+    """Append the whole of src to dst, copying inside the kernel when possible"""
+    size = os.fstat(src.fileno()).st_size
+    dst.flush()
+
+    offset = 0
+    if hasattr(os, 'sendfile'):
+        try:
+            while offset < size:
+                sent = os.sendfile(dst.fileno(), src.fileno(), offset, size - offset)
+                if not sent:
+                    break
+                offset += sent
+        except OSError:
+            # Some platforms only sendfile() to sockets
+            if offset:
+                raise
+
+    if offset < size:
+        src.seek(offset)
+        shutil.copyfileobj(src, dst, 1 << 20)
+
+
 def generate_aes_gcm_iv() -> bytes:
     return secrets.token_bytes(AES_GCM_IV_LEN)
 
@@ -708,6 +906,8 @@ class AESEncryption:
         self.config = config
         self.key = config.AES_KEY
         self.auth_data = config.AES_AUTH_DATA
+        # The key schedule is expanded once here and reused for every image
+        self._aead = AESGCM(self.key) if _aesgcm_available and self.key is not None else None
 
     def _resolve_iv(self) -> bytes:
         if self.config.AES_USE_EMBEDDED_IV:
@@ -730,13 +930,18 @@ class AESEncryption:
             Tuple of (iv, ciphertext, authentication_tag)
         """
         iv = self._resolve_iv()
-        cipher = AES.new(self.key, AES.MODE_GCM, nonce=iv)
-        cipher.update(self.auth_data)
-        ciphertext, tag = cipher.encrypt_and_digest(data)
+        if self._aead is not None:
+            sealed = self._aead.encrypt(iv, data, self.auth_data or None)
+            ciphertext, tag = sealed[:-AES_GCM_TAG_LEN], sealed[-AES_GCM_TAG_LEN:]
+        else:
+            cipher = AES.new(self.key, AES.MODE_GCM, nonce=iv)
+            cipher.update(self.auth_data)
+            ciphertext, tag = cipher.encrypt_and_digest(data)
         
         logging.debug(f"AES-GCM encrypted {len(data)} bytes")
-        logging.debug(f"Ciphertext: {format_hex_bytes(ciphertext, 'ciphertext: ')}")
-        logging.debug(f"Tag: {format_hex_bytes(tag, 'tag: ')}")
+        if debug_enabled():
+            logging.debug(f"Ciphertext: {format_hex_preview(ciphertext, 'ciphertext: ')}")
+            logging.debug(f"Tag: {format_hex_bytes(tag, 'tag: ')}")
         
         return iv, ciphertext, tag
     
@@ -753,9 +958,15 @@ class AESEncryption:
         if self.config.AES_IV is None:
             raise ValueError("AES IV is not configured")
 
-        cipher = AES.new(self.key, AES.MODE_GCM, nonce=self.config.AES_IV)
-        cipher.update(self.auth_data)
-        plaintext = cipher.decrypt_and_verify(ciphertext, tag)
+        if self._aead is not None:
+            try:
+                plaintext = self._aead.decrypt(self.config.AES_IV, ciphertext + tag, self.auth_data or None)
+            except InvalidTag:
+                raise ValueError("MAC check failed")
+        else:
+            cipher = AES.new(self.key, AES.MODE_GCM, nonce=self.config.AES_IV)
+            cipher.update(self.auth_data)
+            plaintext = cipher.decrypt_and_verify(ciphertext, tag)
         
         logging.debug(f"AES-GCM decrypted {len(plaintext)} bytes")
         return plaintext
@@ -767,7 +978,10 @@ class SM4Encryption:
     def __init__(self, config: FirmwareConfig):
         self.config = config
         self.key = config.SM4_KEY
+        self._use_openssl = _openssl_has_sm4()
         self.crypt_sm4 = CryptSM4()
+        # set_key() changes the cipher state, so concurrent images take turns
+        self._lock = threading.Lock()
 
     def _resolve_iv(self) -> bytes:
         if self.config.SM4_USE_EMBEDDED_IV:
@@ -790,11 +1004,23 @@ class SM4Encryption:
             Tuple of (iv, encrypted_data)
         """
         iv = self._resolve_iv()
-        self.crypt_sm4.set_key(self.key, SM4_ENCRYPT)
-        encrypted = self.crypt_sm4.crypt_cbc(iv, data)
+        if self._use_openssl:
+            # CBC state cannot be reused, so every image gets its own cipher
+            padder = sym_padding.PKCS7(SM4_BLOCK_BITS).padder()
+            encryptor = Cipher(algorithms.SM4(self.key), modes.CBC(iv)).encryptor()
+            encrypted = b''.join((
+                encryptor.update(padder.update(data)),
+                encryptor.update(padder.finalize()),
+                encryptor.finalize(),
+            ))
+        else:
+            with self._lock:
+                self.crypt_sm4.set_key(self.key, SM4_ENCRYPT)
+                encrypted = self.crypt_sm4.crypt_cbc(iv, data)
         
         logging.debug(f"SM4-CBC encrypted {len(data)} bytes")
-        logging.debug(f"Encrypted: {format_hex_bytes(encrypted, 'encryption: ')}")
+        if debug_enabled():
+            logging.debug(f"Encrypted: {format_hex_preview(encrypted, 'encryption: ')}")
         
         return iv, encrypted
     
@@ -810,8 +1036,14 @@ class SM4Encryption:
         if self.config.SM4_IV is None:
             raise ValueError("SM4 IV is not configured")
 
-        self.crypt_sm4.set_key(self.key, SM4_DECRYPT)
-        decrypted = self.crypt_sm4.crypt_cbc(self.config.SM4_IV, data)
+        if self._use_openssl:
+            unpadder = sym_padding.PKCS7(SM4_BLOCK_BITS).unpadder()
+            decryptor = Cipher(algorithms.SM4(self.key), modes.CBC(self.config.SM4_IV)).decryptor()
+            decrypted = unpadder.update(decryptor.update(data) + decryptor.finalize()) + unpadder.finalize()
+        else:
+            with self._lock:
+                self.crypt_sm4.set_key(self.key, SM4_DECRYPT)
+                decrypted = self.crypt_sm4.crypt_cbc(self.config.SM4_IV, data)
         
         logging.debug(f"SM4-CBC decrypted {len(decrypted)} bytes")
         return decrypted
@@ -833,16 +1065,16 @@ class RSASignature:
         if self.config.RSA_MODULUS is None or self.config.RSA_EXPONENT is None or self.config.RSA_PRIVATE_EXPONENT is None:
             raise ValueError("RSA configuration is incomplete")
 
-        modulus_hex = bytes.hex(self.config.RSA_MODULUS)
-        self.modulus = int(modulus_hex, 16)
+        self.modulus = int.from_bytes(self.config.RSA_MODULUS, 'big')
         self.exponent = int(self.config.RSA_EXPONENT, 16)
+        self.private_exponent = int.from_bytes(self.config.RSA_PRIVATE_EXPONENT, 'big')
         
-        private_hex = bytes.hex(self.config.RSA_PRIVATE_EXPONENT)
-        self.private_exponent = int(private_hex, 16)
-        
-        # Create RSA key objects
+        # Create RSA key objects, plus the PKCS#1 v1.5 signer and verifier
+        # reused for every signature
         self.public_key = RSA.construct((self.modulus, self.exponent))
         self.private_key = RSA.construct((self.modulus, self.exponent, self.private_exponent))
+        self.signer = pkcs1_15.new(self.private_key)
+        self.verifier = pkcs1_15.new(self.public_key)
         
     def sign(self, data: bytes) -> bytes:
         """Sign data using RSA-2048 with SHA256
@@ -854,10 +1086,11 @@ class RSASignature:
             Signature bytes
         """
         digest = SHA256.new(data)
-        signature = pkcs1_15.new(self.private_key).sign(digest)
+        signature = self.signer.sign(digest)
         
         logging.debug(f"RSA signed {len(data)} bytes")
-        logging.debug(f"Signature: {format_hex_bytes(signature, 'signature: ')}")
+        if debug_enabled():
+            logging.debug(f"Signature: {format_hex_bytes(signature, 'signature: ')}")
         
         return signature
     
@@ -873,7 +1106,7 @@ class RSASignature:
         """
         try:
             digest = SHA256.new(data)
-            pkcs1_15.new(self.public_key).verify(digest, signature)
+            self.verifier.verify(digest, signature)
             logging.debug("RSA signature verification: valid")
             return True
         except (ValueError, TypeError):
@@ -890,10 +1123,24 @@ class SM2Signature:
         
     def _setup_keys(self) -> None:
         """Setup SM2 keys from configuration"""
-        self.private_key_hex = codecs.encode(self.config.SM2_PRIVATE_KEY, 'hex').decode('ascii')
+        self.private_key_hex = self.config.SM2_PRIVATE_KEY.hex()
         self.public_key = self.config.SM2_PUBLIC_KEY_X + self.config.SM2_PUBLIC_KEY_Y
-        self.public_key_hex = codecs.encode(self.public_key, 'hex').decode('ascii')
-        self.id_hex = codecs.encode(self.config.SM2_ID, 'hex').decode('ascii')
+        self.public_key_hex = self.public_key.hex()
+        self.id_hex = self.config.SM2_ID.hex()
+        self.sm2_crypt = sm2.CryptSM2(
+            public_key=self.public_key_hex, 
+            private_key=self.private_key_hex
+        )
+
+        # Z only depends on the ID, the curve and the public key, so it is
+        # assembled from raw bytes and hashed once per key
+        ecc_table = self.sm2_crypt.ecc_table
+        z_bytes = b''.join((
+            b'\x00\x80',
+            self.config.SM2_ID,
+            bytes.fromhex(ecc_table['a'] + ecc_table['b'] + ecc_table['g'] + self.sm2_crypt.public_key),
+        ))
+        self.za = sm3_digest(z_bytes)
         
     def sign(self, data: bytes) -> Tuple[bytes, bytes, bytes]:
         """Sign data using SM2
@@ -904,39 +1151,26 @@ class SM2Signature:
         Returns:
             Tuple of (signature, r_component, s_component)
         """
-        sm2_crypt = sm2.CryptSM2(
-            public_key=self.public_key_hex, 
-            private_key=self.private_key_hex
-        )
+        sm2_crypt = self.sm2_crypt
 
         if self.config.SM2_RANDOM_K is not None:
             logging.warning("Ignoring configured sm2.random_k and generating a fresh SM2 nonce from a CSPRNG")
         
-        # Calculate Z value for SM2
-        z = ('0080' + self.id_hex + sm2_crypt.ecc_table['a'] + 
-             sm2_crypt.ecc_table['b'] + sm2_crypt.ecc_table['g'] + 
-             sm2_crypt.public_key)
-        z_bytes = binascii.a2b_hex(z)
-        za = sm3.sm3_hash(func.bytes_to_list(z_bytes))
-        
         # Calculate message hash
-        m_prime = (za + data.hex()).encode('utf-8')
-        e = sm3.sm3_hash(func.bytes_to_list(binascii.a2b_hex(m_prime)))
-        sign_data = binascii.a2b_hex(e.encode('utf-8'))
+        sign_data = sm3_digest(self.za, data)
         
         # Generate signature
+        # gmssl returns r || s as hex; decode it once and split the bytes
         sign = sm2_crypt.sign(sign_data, generate_sm2_nonce_hex(sm2_crypt))
-        r = sign[0:sm2_crypt.para_len]
-        s = sign[sm2_crypt.para_len:]
-        
-        sign_bytes = binascii.a2b_hex(sign)
-        r_bytes = binascii.a2b_hex(r)
-        s_bytes = binascii.a2b_hex(s)
+        sign_bytes = bytes.fromhex(sign)
+        r_bytes = sign_bytes[:sm2_crypt.para_len // 2]
+        s_bytes = sign_bytes[sm2_crypt.para_len // 2:]
         
         logging.debug(f"SM2 signed {len(data)} bytes")
-        logging.debug(f"Signature: {format_hex_bytes(sign_bytes, 'sign: ')}")
-        logging.debug(f"R component: {format_hex_bytes(r_bytes, 'r: ')}")
-        logging.debug(f"S component: {format_hex_bytes(s_bytes, 's: ')}")
+        if debug_enabled():
+            logging.debug(f"Signature: {format_hex_bytes(sign_bytes, 'sign: ')}")
+            logging.debug(f"R component: {format_hex_bytes(r_bytes, 'r: ')}")
+            logging.debug(f"S component: {format_hex_bytes(s_bytes, 's: ')}")
         
         return sign_bytes, r_bytes, s_bytes
     
@@ -950,22 +1184,10 @@ class SM2Signature:
         Returns:
             True if signature is valid, False otherwise
         """
-        sm2_crypt = sm2.CryptSM2(
-            public_key=self.public_key_hex, 
-            private_key=self.private_key_hex
-        )
-        
-        # Calculate Z value for SM2
-        z = ('0080' + self.id_hex + sm2_crypt.ecc_table['a'] + 
-             sm2_crypt.ecc_table['b'] + sm2_crypt.ecc_table['g'] + 
-             sm2_crypt.public_key)
-        z_bytes = binascii.a2b_hex(z)
-        za = sm3.sm3_hash(func.bytes_to_list(z_bytes))
+        sm2_crypt = self.sm2_crypt
         
         # Calculate message hash
-        m_prime = (za + data.hex()).encode('utf-8')
-        e = sm3.sm3_hash(func.bytes_to_list(binascii.a2b_hex(m_prime)))
-        sign_data = binascii.a2b_hex(e.encode('utf-8'))
+        sign_data = sm3_digest(self.za, data)
         
         verify = sm2_crypt.verify(signature, sign_data)
         logging.debug(f"SM2 signature verification: {verify}")
@@ -977,102 +1199,115 @@ class SM2Signature:
 # ============================================================================
 
 class HeaderFormatter:
-    """Base class for firmware header formatting"""
+    """Base class for firmware header formatting
+
+    A header is a key block that only depends on the configuration,
+    followed by an image block (signature or hash) and zero padding up to
+    HEADER_SIZE.
+    """
+
+    # header_info entries passed to build_image_block, in order
+    image_fields: Tuple[str, ...] = ()
     
     def __init__(self, config: FirmwareConfig):
         self.config = config
+
+    def build_key_block(self) -> bytes:
+        """Build the configuration dependent part of the header"""
+        return b''
+
+    def build_image_block(self, *args, **kwargs) -> bytes:
+        """Build the image dependent part of the header"""
+        raise NotImplementedError("Subclasses must implement build_image_block")
         
-    def write_header(self, output_file, **kwargs) -> None:
+    def build_header(self, *args, **kwargs) -> bytes:
+        """Build the header bytes"""
+        header = self.build_key_block() + self.build_image_block(*args, **kwargs)
+        return header + zeros(self.config.HEADER_SIZE - len(header))
+
+    def write_header(self, output_file, *args, **kwargs) -> None:
         """Write header to output file"""
-        raise NotImplementedError("Subclasses must implement write_header")
+        output_file.write(self.build_header(*args, **kwargs))
 
 
 class RSAHeaderFormatter(HeaderFormatter):
     """RSA firmware header formatter"""
-    
-    def write_header(self, output_file, modulus: int, exponent: int, signature: bytes) -> None:
-        """Write RSA header to output file
-        
-        Args:
-            output_file: Output file handle
-            modulus: RSA modulus
-            exponent: RSA exponent
-            signature: RSA signature
-        """
-        # Write modulus (2048 bits)
+
+    image_fields = ('modulus', 'exponent', 'signature')
+
+    def build_key_block(self) -> bytes:
+        """Build the RSA public key: modulus (2048 bits) and exponent (4 bytes)"""
         if self.config.RSA_MODULUS is None or self.config.RSA_EXPONENT is None:
             raise ValueError("RSA configuration is incomplete")
 
         modulus_bytes = self.config.RSA_MODULUS
-        output_file.write(modulus_bytes)
-        
-        # Write exponent (4 bytes)
-        exponent_bytes = int(self.config.RSA_EXPONENT, 0).to_bytes(4, byteorder=sys.byteorder, signed=True)
-        output_file.write(exponent_bytes)
-        
-        # Write signature
-        output_file.write(signature)
+        exponent_bytes = INT32_ST.pack(int(self.config.RSA_EXPONENT, 0))
         
         # Calculate and log public key hash
         pubkey = modulus_bytes + exponent_bytes
-        pub_hash = hashlib.sha256(pubkey).digest()
-        logging.debug(f"RSA public key hash: {format_hex_bytes(pub_hash)}")
-
+        if debug_enabled():
+            pub_hash = hashlib.sha256(pubkey).digest()
+            logging.debug(f"RSA public key hash: {format_hex_bytes(pub_hash)}")
 
-class SM2HeaderFormatter(HeaderFormatter):
-    """SM2 firmware header formatter"""
+        return pubkey
     
-    def write_header(self, output_file, r_component: bytes, s_component: bytes) -> None:
-        """Write SM2 header to output file
+    def build_image_block(self, modulus: int, exponent: int, signature: bytes) -> bytes:
+        """Build RSA image block
         
         Args:
-            output_file: Output file handle
-            r_component: SM2 R component
-            s_component: SM2 S component
+            modulus: RSA modulus
+            exponent: RSA exponent
+            signature: RSA signature
         """
-        # Write ID length
+        return signature
+
+
+class SM2HeaderFormatter(HeaderFormatter):
+    """SM2 firmware header formatter"""
+
+    image_fields = ('r_component', 's_component')
+
+    def build_key_block(self) -> bytes:
+        """Build the SM2 ID length, padded ID and public key"""
         if self.config.SM2_ID is None or self.config.SM2_PUBLIC_KEY_X is None or self.config.SM2_PUBLIC_KEY_Y is None:
             raise ValueError("SM2 configuration is incomplete")
 
         id_len = len(self.config.SM2_ID)
-        id_len_bytes = id_len.to_bytes(4, byteorder=sys.byteorder, signed=True)
-        output_file.write(id_len_bytes)
+        id_len_bytes = INT32_ST.pack(id_len)
         
-        # Write ID (padded to required size)
+        # ID (padded to required size) and public key components
         id_padded = self.config.SM2_ID + zeros(512 - 32 * 4 - id_len)
-        output_file.write(id_padded)
-        
-        # Write public key components
-        output_file.write(self.config.SM2_PUBLIC_KEY_X)
-        output_file.write(self.config.SM2_PUBLIC_KEY_Y)
-        
-        # Write signature components
-        output_file.write(r_component)
-        output_file.write(s_component)
+        pubkey = id_len_bytes + id_padded + self.config.SM2_PUBLIC_KEY_X + self.config.SM2_PUBLIC_KEY_Y
         
         # Calculate and log public key hash
-        pubkey = id_len_bytes + id_padded + self.config.SM2_PUBLIC_KEY_X + self.config.SM2_PUBLIC_KEY_Y
-        pub_hash = sm3.sm3_hash(func.bytes_to_list(pubkey))
-        pub_hash_bytes = binascii.a2b_hex(pub_hash)
-        logging.debug(f"SM2 public key hash: {format_hex_bytes(pub_hash_bytes)}")
+        if debug_enabled():
+            pub_hash_bytes = sm3_digest(pubkey)
+            logging.debug(f"SM2 public key hash: {format_hex_bytes(pub_hash_bytes)}")
+
+        return pubkey
+    
+    def build_image_block(self, r_component: bytes, s_component: bytes) -> bytes:
+        """Build SM2 image block
+        
+        Args:
+            r_component: SM2 R component
+            s_component: SM2 S component
+        """
+        return r_component + s_component
 
 
 class HashHeaderFormatter(HeaderFormatter):
     """Hash-only firmware header formatter"""
+
+    image_fields = ('hash_data',)
     
-    def write_header(self, output_file, hash_data: bytes) -> None:
-        """Write hash header to output file
+    def build_image_block(self, hash_data: bytes) -> bytes:
+        """Build hash image block
         
         Args:
-            output_file: Output file handle
-            hash_data: SHA-256 hash data
+            hash_data: SHA-256 hash data (32 bytes), padded to HEADER_SIZE
         """
-        # Write hash data (32 bytes)
-        output_file.write(hash_data)
-        
-        # Write padding (516 - 32 bytes)
-        padding = zeros(self.config.HEADER_SIZE - 32)
-        output_file.write(padding)
+        return hash_data
 
 
 # ============================================================================
@@ -1089,6 +1324,31 @@ class FirmwareGenerator:
             self.config.ENCRYPTION_SM4: self._handle_sm4_encryption,
             self.config.ENCRYPTION_AES: self._handle_aes_encryption
         }
+        self.header_formatters = {
+            'rsa': RSAHeaderFormatter(self.config),
+            'sm2': SM2HeaderFormatter(self.config),
+            'hash': HashHeaderFormatter(self.config)
+        }
+        # Header templates by encryption type, see _header_template
+        self._header_templates: Dict[int, Tuple[bytes, HeaderFormatter, int]] = {}
+
+    # Ciphers and signers parse the key material once and are reused for
+    # every image this generator produces.
+    @functools.cached_property
+    def _aes(self) -> AESEncryption:
+        return AESEncryption(self.config)
+
+    @functools.cached_property
+    def _rsa(self) -> RSASignature:
+        return RSASignature(self.config)
+
+    @functools.cached_property
+    def _sm4(self) -> SM4Encryption:
+        return SM4Encryption(self.config)
+
+    @functools.cached_property
+    def _sm2(self) -> SM2Signature:
+        return SM2Signature(self.config)
 
     def generate_firmware(self, input_path: str, output_path: str, 
                          encryption_type: int) -> None:
@@ -1102,54 +1362,90 @@ class FirmwareGenerator:
         # Validate input file
         input_file = validate_file_exists(input_path)
 
-        # Read input data
+        # Handlers read what they need from the open input; the hash-only
+        # payload is copied to the output by the kernel
         with open(input_file, 'rb') as f:
-            input_data = f.read()
+            # Process firmware
+            processed_data, header_info = self.encryption_handlers[encryption_type](f)
 
-        input_data = self._add_version_to_data(input_data)
-
-        # Process firmware
-        processed_data, header_info = self.encryption_handlers[encryption_type](input_data)
-
-        # Write output file
-        self._write_firmware(output_path, processed_data, header_info)
+            # Write output file
+            self._write_firmware(output_path, processed_data, header_info)
 
         logging.info(f"Firmware generated successfully: {output_path}")
         logging.info(f"Encryption type: {encryption_type}")
-        logging.info(f"Output size: {len(processed_data)} bytes")
+        logging.info(f"Output size: {header_info['data_length']} bytes")
+
+    def generate_many(self, jobs: Sequence[Tuple[str, str, int]],
+                      max_workers: Optional[int] = None) -> None:
+        """Generate several firmware images concurrently
+
+        hashlib and AES-GCM release the GIL while they work, so the images
+        are built on a thread pool sharing this generator's ciphers and
+        signers.
+
+        Args:
+            jobs: (input_path, output_path, encryption_type) per image
+            max_workers: Number of threads, defaults to the CPU count
+        """
+        if len(jobs) <= 1:
+            for job in jobs:
+                self.generate_firmware(*job)
+            return
 
-    def _add_version_to_data(self, input_data: bytes) -> bytes:
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            futures = [executor.submit(self.generate_firmware, *job) for job in jobs]
+            # Raise the first failure in job order
+            for future in futures:
+                future.result()
+
+    def _read_versioned_data(self, input_file: BinaryIO) -> bytearray:
+        """Read the whole input with the version header in front of it"""
         try:
             version_header = self.config.VERSION_BYTES
         except AttributeError:
             raise AttributeError("self.config.VERSION_BYTES must be defined to add version header.")
 
-        modified_data = version_header + input_data
-        return modified_data
+        # Read straight into place behind the header instead of concatenating
+        input_size = os.fstat(input_file.fileno()).st_size
+        data = bytearray(len(version_header) + input_size)
+        data[:len(version_header)] = version_header
+        with memoryview(data) as view:
+            input_file.readinto(view[len(version_header):])
+
+        return data
 
-    def _handle_no_encryption(self, data: bytes) -> Tuple[bytes, dict]:
+    def _handle_no_encryption(self, input_file: BinaryIO) -> Tuple[Sequence[Union[bytes, BinaryIO]], dict]:
         """Handle no encryption case"""
         logging.info("Processing with NO ENCRYPTION + SHA-256")
 
-        # Calculate hash
-        hash_data = hashlib.sha256(data).digest()
-        logging.debug(f"SHA-256 hash: {format_hex_bytes(hash_data, 'mesg_hash: ')}")
+        # Hash the version header and then the input straight from the
+        # page cache; the payload itself is never read into memory
+        version_header = self.config.VERSION_BYTES
+        input_size = os.fstat(input_file.fileno()).st_size
+        digest = hashlib.sha256(version_header)
+        if input_size:
+            with mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+        hash_data = digest.digest()
+        if debug_enabled():
+            logging.debug(f"SHA-256 hash: {format_hex_bytes(hash_data, 'mesg_hash: ')}")
         
         header_info = {
             'type': 'hash',
             'hash_data': hash_data,
-            'data_length': len(data),
+            'data_length': len(version_header) + input_size,
             'encryption_type': self.config.ENCRYPTION_NONE
         }
         
-        return data, header_info
+        return (version_header, input_file), header_info
     
-    def _handle_sm4_encryption(self, data: bytes) -> Tuple[bytes, dict]:
+    def _handle_sm4_encryption(self, input_file: BinaryIO) -> Tuple[Sequence[bytes], dict]:
         """Handle SM4-CBC + SM2 encryption"""
         logging.info("Processing with SM4-CBC + SM2")
+        data = self._read_versioned_data(input_file)
         
         # Encrypt with SM4
-        sm4 = SM4Encryption(self.config)
+        sm4 = self._sm4
         iv, encrypted_payload = sm4.encrypt(data)
         if self.config.SM4_USE_EMBEDDED_IV:
             encrypted_data = iv + encrypted_payload
@@ -1157,7 +1453,7 @@ class FirmwareGenerator:
             encrypted_data = encrypted_payload
         
         # Sign with SM2
-        sm2 = SM2Signature(self.config)
+        sm2 = self._sm2
         signature, r_component, s_component = sm2.sign(encrypted_data)
         
         header_info = {
@@ -1168,22 +1464,23 @@ class FirmwareGenerator:
             'encryption_type': self.config.ENCRYPTION_SM4
         }
         
-        return encrypted_data, header_info
+        return (encrypted_data,), header_info
     
-    def _handle_aes_encryption(self, data: bytes) -> Tuple[bytes, dict]:
+    def _handle_aes_encryption(self, input_file: BinaryIO) -> Tuple[Sequence[bytes], dict]:
         """Handle AES-GCM + RSA encryption"""
         logging.info("Processing with AES-GCM + RSA-2048")
+        data = self._read_versioned_data(input_file)
         
         # Encrypt with AES-GCM
-        aes = AESEncryption(self.config)
+        aes = self._aes
         iv, ciphertext, tag = aes.encrypt(data)
         if self.config.AES_USE_EMBEDDED_IV:
-            encrypted_data = iv + ciphertext + tag
+            encrypted_data = (iv, ciphertext, tag)
         else:
-            encrypted_data = ciphertext + tag
+            encrypted_data = (ciphertext, tag)
         
         # Sign tag with RSA
-        rsa = RSASignature(self.config)
+        rsa = self._rsa
         signature = rsa.sign(tag)
         
         header_info = {
@@ -1191,55 +1488,78 @@ class FirmwareGenerator:
             'modulus': rsa.modulus,
             'exponent': rsa.exponent,
             'signature': signature,
-            'data_length': len(encrypted_data),
+            'data_length': sum(len(part) for part in encrypted_data),
             'encryption_type': self.config.ENCRYPTION_AES
         }
         
         return encrypted_data, header_info
     
-    def _write_firmware(self, output_path: str, data: bytes, header_info: dict) -> None:
-        """Write firmware file with proper header"""
-        with open(output_path, 'wb') as f:
-            # Write magic bytes
-            f.write(self.config.MAGIC_BYTES)
-            logging.debug(f"Magic bytes: {format_hex_bytes(self.config.MAGIC_BYTES, 'the magic is: ')}")
-            
-            # Write data length
-            length_bytes = header_info['data_length'].to_bytes(4, byteorder=sys.byteorder, signed=True)
-            f.write(length_bytes)
-            
-            # Write encryption type
-            enc_type_bytes = header_info['encryption_type'].to_bytes(4, byteorder=sys.byteorder, signed=True)
-            f.write(enc_type_bytes)
-            logging.debug(f"Encryption type: {header_info['encryption_type']}")
-            
-            # Write appropriate header
-            self._write_specific_header(f, header_info)
-            
-            # Write firmware data
-            f.write(data)
-    
-    def _write_specific_header(self, output_file, header_info: dict) -> None:
-        """Write specific header based on type"""
-        if header_info['type'] == 'rsa':
-            formatter = RSAHeaderFormatter(self.config)
-            formatter.write_header(
-                output_file,
-                header_info['modulus'],
-                header_info['exponent'],
-                header_info['signature']
-            )
-        elif header_info['type'] == 'sm2':
-            formatter = SM2HeaderFormatter(self.config)
-            formatter.write_header(
-                output_file,
-                header_info['r_component'],
-                header_info['s_component']
-            )
-        elif header_info['type'] == 'hash':
-            formatter = HashHeaderFormatter(self.config)
-            formatter.write_header(output_file, header_info['hash_data'])
+    def _write_firmware(self, output_path: str, data: Sequence[Union[bytes, BinaryIO]], header_info: dict) -> None:
+        """Write firmware file with proper header
+
+        data holds the payload as parts written back to back; a part is
+        either a buffer or an open file whose whole contents are copied.
+        """
+        template, formatter, image_offset = self._header_template(header_info)
+
+        # Only the data length and the image block differ between images
+        header = bytearray(template)
+        FIRMWARE_PREAMBLE_ST.pack_into(header, len(self.config.MAGIC_BYTES),
+                                       header_info['data_length'], header_info['encryption_type'])
+        image_block = formatter.build_image_block(*(header_info[name] for name in formatter.image_fields))
+        header[image_offset:image_offset + len(image_block)] = image_block
+
+        # The payload may still be read from the input file, which can be
+        # the output itself, so the image is written next to it and only
+        # renamed into place once complete
+        temp_path = f"{output_path}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                # Write magic bytes, data length, encryption type and the
+                # appropriate header in a single write
+                f.write(header)
+                if debug_enabled():
+                    logging.debug(f"Magic bytes: {format_hex_bytes(self.config.MAGIC_BYTES, 'the magic is: ')}")
+                logging.debug(f"Encryption type: {header_info['encryption_type']}")
+                
+                # Write firmware data
+                for part in data:
+                    if hasattr(part, 'fileno'):
+                        copy_file_contents(part, f)
+                    else:
+                        f.write(part)
+            os.replace(temp_path, output_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def _header_template(self, header_info: dict) -> Tuple[bytes, HeaderFormatter, int]:
+        """Get the header template for an encryption type
+
+        The template holds the magic bytes, encryption type and key block,
+        which are built once per generator. Returns the template, its
+        formatter and the offset of the image block.
+        """
+        encryption_type = header_info['encryption_type']
+        cached = self._header_templates.get(encryption_type)
+        if cached is not None:
+            return cached
+
+        formatter = self.header_formatters[header_info['type']]
+        key_block = formatter.build_key_block()
+        key_offset = len(self.config.MAGIC_BYTES) + FIRMWARE_PREAMBLE_ST.size
+
+        template = bytearray(key_offset + self.config.HEADER_SIZE)
+        template[:len(self.config.MAGIC_BYTES)] = self.config.MAGIC_BYTES
+        FIRMWARE_PREAMBLE_ST.pack_into(template, len(self.config.MAGIC_BYTES), 0, encryption_type)
+        template[key_offset:key_offset + len(key_block)] = key_block
 
+        cached = (bytes(template), formatter, key_offset + len(key_block))
+        self._header_templates[encryption_type] = cached
+        return cached
 
 # ============================================================================
 # Command Line Interface
@@ -1256,20 +1576,23 @@ Examples:
   %(prog)s -i input.bin -o output.bin --sm4
   %(prog)s -i input.bin -o output.bin --no-encryption
   %(prog)s -i input.bin -o output.bin --aes -c config.json
+  %(prog)s -i a.bin b.bin -o a.img b.img --aes -c config.json
   %(prog)s --generate-config template.json
         """
     )
     
     parser.add_argument(
         '-i', '--input',
+        nargs='+',
         required=False,
-        help='Input firmware file path'
+        help='Input firmware file path(s)'
     )
     
     parser.add_argument(
         '-o', '--output',
+        nargs='+',
         required=False,
-        help='Output firmware file path'
+        help='Output firmware file path(s), one per input'
     )
     
     parser.add_argument(
@@ -1331,6 +1654,8 @@ def main() -> None:
         # Validate required arguments for firmware generation
         if not args.input or not args.output:
             parser.error("Input and output files are required for firmware generation")
+        if len(args.input) != len(args.output):
+            parser.error("Each input file needs exactly one output file")
         
         # Determine encryption type
         if args.aes:
@@ -1361,7 +1686,10 @@ def main() -> None:
 
         # Generate firmware
         generator = FirmwareGenerator(config)
-        generator.generate_firmware(args.input, args.output, encryption_type)
+        generator.generate_many([
+            (input_path, output_path, encryption_type)
+            for input_path, output_path in zip(args.input, args.output)
+        ])
 
     except Exception as e:
         logging.error(f"Firmware generation failed: {e}")
@@ -8,30 +8,79 @@ handling different operating systems and providing a clean API for
 compression and decompression operations.
 """
 
+from __future__ import annotations
+
 import os
+import re
 import sys
-import subprocess
 import argparse
 import logging
-import platform
 import shutil
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Union, Dict, Any
+from typing import TYPE_CHECKING, BinaryIO, Callable, Iterable, List, Optional, Sequence, Tuple, Union, Dict, Any
 from enum import Enum
 
+if TYPE_CHECKING:
+    import subprocess
+
+# Optional in-process gzip (Intel ISA-L) for compress_data/decompress_data,
+# only used when a K230PrivGzip is created with use_isal=True
+_isal_available = True
+
+try:
+    from isal import igzip, isal_zlib
+except ImportError:
+    _isal_available = False
+
 
 class CompressionLevel(Enum):
     """Compression level options"""
-    FAST = 1
+    FAST = 4
     DEFAULT = 6
     BEST = 9
 
 
+# Levels accepted for the bundled gzip 1.6. Level 1 is broken: it fails
+# with "block vanished" on some files and can corrupt text on a round
+# trip. Levels 2-3 are left out as a precaution, since level 3 output is
+# even larger than level 2's. (Its output differs from GNU gzip at every
+# level, so that is not a reason to exclude any of them.)
+MIN_COMPRESSION_LEVEL = 4
+MAX_COMPRESSION_LEVEL = 9
+
+# Levels compress_file tries in turn when no level is given. Level 6 is
+# gzip's own default; 9 costs several times the CPU for a few percent.
+DEFAULT_COMPRESSION_LEVELS = (6, 5, 4)
+
+# Input for the in-memory operations: a bytes-like object (bytes, memoryview,
+# mmap) or an open file handed to the tool as its stdin
+InputData = Union[bytes, bytearray, memoryview, BinaryIO]
+
+# Last line of 'k230_priv_gzip -l': compressed, uncompressed, ratio, name
+LIST_LINE_RE = re.compile(rb'^\s*(\d+)\s+(\d+)\s+(-?[\d.]+)%\s+(.+?)\s*\Z', re.MULTILINE)
+
+
+def _isal_level(compression_level: Optional[int]) -> int:
+    """Map a gzip level (4-9, None for gzip's default) onto ISA-L's levels (0-3)"""
+    if compression_level is None:
+        compression_level = CompressionLevel.DEFAULT.value
+    return min(isal_zlib.ISAL_BEST_COMPRESSION, (compression_level - 1) // 3 + 1)
+
+
 class K230PrivGzipError(Exception):
     """Custom exception for k230_priv_gzip operations"""
     pass
 
 
+def _check_compression_level(compression_level: int) -> None:
+    if not MIN_COMPRESSION_LEVEL <= compression_level <= MAX_COMPRESSION_LEVEL:
+        raise K230PrivGzipError(
+            f"Compression level must be between {MIN_COMPRESSION_LEVEL} and {MAX_COMPRESSION_LEVEL}"
+        )
+
+
 class K230PrivGzip:
     """
     Python wrapper for k230_priv_gzip executable with cross-platform support.
@@ -41,20 +90,47 @@ class K230PrivGzip:
     compression and decompression operations.
     """
 
-    def __init__(self, executable_path: Optional[str] = None):
+    def __init__(self, executable_path: Optional[str] = None,
+                 compression_level: Optional[int] = None,
+                 default_levels: Sequence[int] = DEFAULT_COMPRESSION_LEVELS,
+                 use_isal: bool = False):
         """
         Initialize the k230_priv_gzip wrapper.
         
         Args:
             executable_path: Path to k230_priv_gzip executable. If None,
                            will try to find it in standard locations.
+            compression_level: Default compression level (4-9) used when a
+                           call does not pass one. If None, compress_file
+                           tries default_levels in turn and compress_data
+                           uses the tool's default.
+            default_levels: Levels compress_file falls back through when
+                           no level is set. Starts at gzip's default of 6;
+                           pass e.g. (9, 8, 7, 6) for maximum compression.
+            use_isal: Run compress_data/decompress_data in-process with
+                           the isal package instead of the tool. The output
+                           is valid gzip but not byte-identical to the
+                           tool's.
         
         Raises:
-            K230PrivGzipError: If the executable cannot be found.
+            K230PrivGzipError: If the executable cannot be found, a
+                           compression level is out of range or use_isal
+                           is set without the isal package installed.
         """
+        if compression_level is not None:
+            _check_compression_level(compression_level)
+        if not default_levels:
+            raise K230PrivGzipError("At least one default compression level is required")
+        for level in default_levels:
+            _check_compression_level(level)
+        if use_isal and not _isal_available:
+            raise K230PrivGzipError("use_isal requires the isal package")
+
         self.executable_path = self._find_executable(executable_path)
         self.logger = logging.getLogger(__name__)
-        self.compression_levels_to_try = [9, 8, 7, 6, 5, 4]
+        self.compression_level = compression_level
+        self.compression_levels_to_try = list(default_levels)
+        self.use_isal = use_isal
 
     def _find_executable(self, provided_path: Optional[str] = None) -> str:
         """
@@ -79,23 +155,26 @@ class K230PrivGzip:
             else:
                 raise K230PrivGzipError(f"Executable not found or not executable: {provided_path}")
 
-        # Determine the correct executable name for the platform
-        if platform.system() == "Windows":
-            full_executable_name = f"{executable_name}.exe"
-        else:
-            full_executable_name = executable_name
+        return self._search_executable(executable_name)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _search_executable(executable_name: str) -> str:
+        """
+        Search the bundled bin directory and then PATH for the executable.
 
-        # 2. Try to find executable in the same directory as this script (bin/subdir)
-        # This uses Path(__file__).resolve().parent to get the directory consistently.
+        The result is cached, so further wrapper instances in the same
+        process do not probe the filesystem again.
+        """
+        # 2. Try to find executable in the bin directory next to this script.
+        # shutil.which adds the PATHEXT extensions ('.exe') on Windows.
         script_dir = Path(__file__).resolve().parent
-        local_executable = script_dir / "bin" / full_executable_name
+        local_executable = shutil.which(executable_name, path=str(script_dir / "bin"))
 
-        if local_executable.exists() and os.access(local_executable, os.X_OK):
-            return str(local_executable.resolve())
+        if local_executable:
+            return str(Path(local_executable).resolve())
 
-        # 3. Try to find in system PATH using shutil.which (platform-aware)
-        # shutil.which handles the differences between 'which' and 'where',
-        # and automatically checks for the '.exe' extension on Windows.
+        # 3. Try to find in system PATH, in-process rather than via 'which'/'where'
         system_executable = shutil.which(executable_name)
 
         if system_executable:
@@ -103,19 +182,27 @@ class K230PrivGzip:
 
         # 4. Final failure if not found
         raise K230PrivGzipError(
-            f"'{full_executable_name}' executable not found. Please ensure it is installed "
+            f"'{executable_name}' executable not found. Please ensure it is installed "
             "and accessible via PATH, or provide the path explicitly."
         )
     
-    def _execute_command(self, args: List[str], input_data: Optional[bytes] = None,
-                        capture_output: bool = True) -> subprocess.CompletedProcess:
+    def _execute_command(self, args: List[str], input_data: Optional[InputData] = None,
+                        capture_output: bool = True,
+                        stdout_file: Optional[BinaryIO] = None,
+                        capture_stderr: bool = True) -> subprocess.CompletedProcess:
         """
         Execute the k230_priv_gzip command with proper error handling.
         
         Args:
             args: Command line arguments
-            input_data: Data to pipe to stdin (optional)
+            input_data: Data to pipe to stdin, or an open file to use as
+                        stdin (optional)
             capture_output: Whether to capture stdout/stderr
+            stdout_file: Open file the child writes its stdout to directly,
+                         instead of it passing through Python (optional)
+            capture_stderr: Whether to capture stderr along with stdout for
+                            the error message. When False, stderr goes to
+                            ours unless debug logging is on.
             
         Returns:
             subprocess.CompletedProcess object
@@ -123,24 +210,31 @@ class K230PrivGzip:
         Raises:
             K230PrivGzipError: If command execution fails
         """
+        # Imported on first use; in-process ISA-L calls never need it
+        import subprocess
+
         cmd = [self.executable_path] + args
         
         try:
             self.logger.debug(f"Executing command: {' '.join(cmd)}")
             
-            if input_data is not None:
-                result = subprocess.run(
-                    cmd,
-                    input=input_data,
-                    capture_output=capture_output,
-                    check=False
-                )
+            run_kwargs: Dict[str, Any] = {}
+            if hasattr(input_data, 'fileno'):
+                # The child reads the file itself instead of through a pipe
+                run_kwargs['stdin'] = input_data
+            elif input_data is not None:
+                run_kwargs['input'] = input_data
+
+            if stdout_file is not None:
+                run_kwargs['stdout'] = stdout_file
+                run_kwargs['stderr'] = subprocess.PIPE
+            elif capture_output and not capture_stderr and not self.logger.isEnabledFor(logging.DEBUG):
+                # Only stdout is needed; the tool reports errors on our stderr
+                run_kwargs['stdout'] = subprocess.PIPE
             else:
-                result = subprocess.run(
-                    cmd,
-                    capture_output=capture_output,
-                    check=False
-                )
+                run_kwargs['capture_output'] = capture_output
+
+            result = subprocess.run(cmd, check=False, **run_kwargs)
             
             # Check for errors
             if result.returncode != 0:
@@ -158,28 +252,39 @@ class K230PrivGzip:
 
     def _replace_byte_at_index(self, file_path: str, index: int, old_byte: int, new_byte: int):
         """Replaces a specific byte in the file. (As implemented in a previous turn)"""
-        if not os.path.isfile(file_path):
-            raise FileNotFoundError(f"File not found: {file_path}")
-
+        # No separate existence check: opening the file reports a missing one
         try:
-            with open(file_path, 'r+b') as f:
-                f.seek(index)
-                target_byte = f.read(1)
-                
-                if not target_byte:
-                    raise EOFError(f"File too short to access index {index}")
-
-                if target_byte[0] == old_byte:
+            if hasattr(os, 'pwrite'):
+                # Check and patch the byte in place without a buffered file
+                fd = os.open(file_path, os.O_RDWR)
+                try:
+                    target_byte = os.pread(fd, 1, index)
+                    self._check_target_byte(target_byte, index, old_byte)
+                    os.pwrite(fd, bytes([new_byte]), index)
+                finally:
+                    os.close(fd)
+            else:
+                with open(file_path, 'r+b') as f:
+                    f.seek(index)
+                    target_byte = f.read(1)
+                    self._check_target_byte(target_byte, index, old_byte)
                     f.seek(index)
                     f.write(bytes([new_byte]))
-                    logging.debug(f"Byte at index {index} changed 0x{old_byte:02x} -> 0x{new_byte:02x}.")
-                else:
-                    raise ValueError(
-                        f"Expected byte 0x{old_byte:02x} at index {index}, found 0x{target_byte[0]:02x}"
-                    )
+            logging.debug(f"Byte at index {index} changed 0x{old_byte:02x} -> 0x{new_byte:02x}.")
         except Exception as e:
             raise K230PrivGzipError(f"Error modifying byte at index {index} in {file_path}: {e}")
 
+    @staticmethod
+    def _check_target_byte(target_byte: bytes, index: int, old_byte: int) -> None:
+        """Check the byte read back before it is replaced"""
+        if not target_byte:
+            raise EOFError(f"File too short to access index {index}")
+
+        if target_byte[0] != old_byte:
+            raise ValueError(
+                f"Expected byte 0x{old_byte:02x} at index {index}, found 0x{target_byte[0]:02x}"
+            )
+
     def compress_file(self, input_path: str, output_path: Optional[str] = None,
                       keep_original: bool = True, compression_level: Optional[int] = None,
                       force: bool = True, suffix: str = ".gz") -> str:
@@ -191,41 +296,46 @@ class K230PrivGzip:
             raise K230PrivGzipError(f"Input file not found: {input_path}")
 
         final_output_path = output_path if output_path else input_path + suffix
+        # An explicit output is written next to its final name and only
+        # renamed into place once it is complete and patched
+        written_path = final_output_path + ".tmp" if output_path else final_output_path
         compression_successful = False
         
+        if compression_level is None:
+            compression_level = self.compression_level
+
         # Determine which levels to attempt
         levels_to_try = []
         if compression_level is not None:
             # If a level is explicitly given, try only that one
+            _check_compression_level(compression_level)
             levels_to_try = [compression_level]
         else:
             # Otherwise, use the predefined fallback order
             levels_to_try = self.compression_levels_to_try
 
+        # Options shared by every level (-f and -k from shell script)
+        common_args = []
+        if keep_original:
+            common_args.append("-k")
+        if force:
+            common_args.append("-f")
+        if suffix != ".gz":
+            common_args.extend(["-S", suffix])
+
         # --- 1. Compression Loop with Fallback ---
 
         for level in levels_to_try:
-            base_args = ["-n"] # Do not save or restore the original name and time stamp
-
-            # Add compression level
-            base_args.append(f"-{level}") # The shell script uses -n, assuming k230_priv_gzip supports this format
-
-            # Add options (-f and -k from shell script)
-            if keep_original:
-                base_args.append("-k")
-            if force:
-                base_args.append("-f")
-            if suffix != ".gz":
-                base_args.extend(["-S", suffix])
+            # -n: Do not save or restore the original name and time stamp,
+            # followed by the compression level
+            base_args = ["-n", f"-{level}", *common_args]
 
             try:
                 if output_path:
-                    # Case A: Output to stdout, then write to file
+                    # Case A: Output to stdout, which is the output file
                     args = base_args + ["-c", input_path]
-                    result = self._execute_command(args)
-
-                    with open(final_output_path, 'wb') as f:
-                        f.write(result.stdout)
+                    with open(written_path, 'wb') as f:
+                        self._execute_command(args, stdout_file=f)
 
                 else:
                     # Case B: In-place compression
@@ -238,25 +348,72 @@ class K230PrivGzip:
 
             except K230PrivGzipError as e:
                 logging.warning(f"Compression failed with level -n{level}. Trying next level. Error: {e}")
-            except subprocess.CalledProcessError as e:
-                logging.warning(f"Compression failed with level -n{level}. Trying next level. Error: {e.stderr.decode() if e.stderr else e}")
             except Exception as e:
+                self._discard_partial_output(written_path, final_output_path)
                 raise K230PrivGzipError(f"An unexpected error occurred during compression: {e}")
 
         if not compression_successful:
+            self._discard_partial_output(written_path, final_output_path)
             raise K230PrivGzipError(f"Compression failed after trying all levels ({levels_to_try}) for file: {input_path}")
 
-        # Target: Byte at index 2 (The third byte)
-        # Change: 0x08 -> 0x09
-        self._replace_byte_at_index(
-            file_path=final_output_path, 
-            index=2, 
-            old_byte=0x08, 
-            new_byte=0x09
-        )
+        try:
+            # Target: Byte at index 2 (The third byte)
+            # Change: 0x08 -> 0x09
+            self._replace_byte_at_index(
+                file_path=written_path, 
+                index=2, 
+                old_byte=0x08, 
+                new_byte=0x09
+            )
+
+            if written_path != final_output_path:
+                os.replace(written_path, final_output_path)
+        except OSError as e:
+            self._discard_partial_output(written_path, final_output_path)
+            raise K230PrivGzipError(f"Failed to write output file: {e}")
+        except K230PrivGzipError:
+            self._discard_partial_output(written_path, final_output_path)
+            raise
 
         return final_output_path
 
+    @staticmethod
+    def _discard_partial_output(written_path: str, final_output_path: str) -> None:
+        """Remove the temporary output of a failed compress_file"""
+        if written_path != final_output_path:
+            try:
+                os.remove(written_path)
+            except FileNotFoundError:
+                pass
+
+    def compress_files(self, pairs: Iterable[Tuple[str, Optional[str]]],
+                       max_workers: Optional[int] = None, **kwargs: Any) -> List[str]:
+        """
+        Compress several files concurrently.
+
+        Each file is compressed by its own k230_priv_gzip process; threads
+        only wait on them, so a thread pool is enough to use every core.
+        
+        Args:
+            pairs: (input_path, output_path) per file; output_path may be
+                   None as for compress_file
+            max_workers: Number of files compressed at once, defaults to
+                         the CPU count
+            **kwargs: Further compress_file options, applied to every file
+            
+        Returns:
+            Paths to the compressed files, in the order of pairs
+            
+        Raises:
+            K230PrivGzipError: If compressing any of the files fails
+        """
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            futures = [
+                executor.submit(self.compress_file, input_path, output_path, **kwargs)
+                for input_path, output_path in pairs
+            ]
+            return [future.result() for future in futures]
+
     def decompress_file(self, input_path: str, output_path: Optional[str] = None,
                        keep_original: bool = True, force: bool = True) -> str:
         """
@@ -289,11 +446,10 @@ class K230PrivGzip:
         if output_path:
             args.extend(["-c", input_path])
             
-            # Write to output file
-            result = self._execute_command(args)
+            # Let the tool write the output file directly
             try:
                 with open(output_path, 'wb') as f:
-                    f.write(result.stdout)
+                    self._execute_command(args, stdout_file=f)
                 return output_path
             except IOError as e:
                 raise K230PrivGzipError(f"Failed to write output file: {e}")
@@ -308,13 +464,19 @@ class K230PrivGzip:
             else:
                 return input_path
     
-    def compress_data(self, data: bytes, compression_level: Optional[int] = None) -> bytes:
+    def compress_data(self, data: InputData, compression_level: Optional[int] = None) -> bytes:
         """
         Compress data in memory using k230_priv_gzip.
+
+        The output is plain gzip (no firmware header patch), so with
+        use_isal set, bytes-like data is compressed in-process with ISA-L
+        instead of spawning the tool.
         
         Args:
-            data: Data to compress
-            compression_level: Compression level (1-9, None for default)
+            data: Data to compress, as a bytes-like object or an open file
+                  the tool reads directly
+            compression_level: Compression level (4-9, None for the
+                               instance default)
             
         Returns:
             Compressed data
@@ -324,22 +486,28 @@ class K230PrivGzip:
         """
         args = ["-c"]  # Write to stdout
         
+        if compression_level is None:
+            compression_level = self.compression_level
+
         # Add compression level if specified
         if compression_level is not None:
-            if not 1 <= compression_level <= 9:
-                raise K230PrivGzipError("Compression level must be between 1 and 9")
+            _check_compression_level(compression_level)
             args.append(f"-{compression_level}")
+
+        if self.use_isal and not hasattr(data, 'fileno'):
+            return igzip.compress(data, compresslevel=_isal_level(compression_level), mtime=0)
         
         # Use stdin for input data
-        result = self._execute_command(args, input_data=data)
+        result = self._execute_command(args, input_data=data, capture_stderr=False)
         return result.stdout
     
-    def decompress_data(self, compressed_data: bytes) -> bytes:
+    def decompress_data(self, compressed_data: InputData) -> bytes:
         """
         Decompress data in memory using k230_priv_gzip.
         
         Args:
-            compressed_data: Compressed data
+            compressed_data: Compressed data, as a bytes-like object or an
+                             open file the tool reads directly
             
         Returns:
             Decompressed data
@@ -347,10 +515,16 @@ class K230PrivGzip:
         Raises:
             K230PrivGzipError: If decompression fails
         """
+        if self.use_isal and not hasattr(compressed_data, 'fileno'):
+            try:
+                return igzip.decompress(compressed_data)
+            except (OSError, EOFError, ValueError) as e:
+                raise K230PrivGzipError(f"Decompression failed: {e}")
+
         args = ["-d", "-c"]  # Decompress and write to stdout
         
         # Use stdin for input data
-        result = self._execute_command(args, input_data=compressed_data)
+        result = self._execute_command(args, input_data=compressed_data, capture_stderr=False)
         return result.stdout
     
     def test_file(self, file_path: str) -> bool:
@@ -394,24 +568,35 @@ class K230PrivGzip:
             raise K230PrivGzipError(f"File not found: {file_path}")
         
         args = ["-l", file_path]
-        result = self._execute_command(args)
+        result = self._execute_command(args, capture_stderr=False)
         
-        # Parse the output (basic parsing)
-        lines = result.stdout.decode('utf-8').strip().split('\n')
-        if len(lines) >= 2:
-            # Try to parse the last line which contains the file info
-            info_line = lines[-1].split()
-            if len(info_line) >= 5:
-                return {
-                    'compressed_size': int(info_line[0]),
-                    'uncompressed_size': int(info_line[1]),
-                    'ratio': float(info_line[2].rstrip('%')),
-                    'uncompressed_name': info_line[-1],
-                    'raw_output': result.stdout.decode('utf-8')
-                }
+        raw_output = result.stdout.decode('utf-8')
+
+        # The last line holds the file info, below the column titles
+        match = LIST_LINE_RE.search(result.stdout)
+        if match:
+            return {
+                'compressed_size': int(match.group(1)),
+                'uncompressed_size': int(match.group(2)),
+                'ratio': float(match.group(3)),
+                'uncompressed_name': match.group(4).decode('utf-8'),
+                'raw_output': raw_output
+            }
         
-        return {'raw_output': result.stdout.decode('utf-8')}
+        return {'raw_output': raw_output}
     
+    @functools.cached_property
+    def version(self) -> str:
+        """
+        Version of k230_priv_gzip, queried from the tool on first access.
+        
+        Raises:
+            K230PrivGzipError: If version command fails
+        """
+        args = ["-V"]
+        result = self._execute_command(args, capture_stderr=False)
+        return result.stdout.decode('utf-8').strip()
+
     def get_version(self) -> str:
         """
         Get the version of k230_priv_gzip.
@@ -422,9 +607,18 @@ class K230PrivGzip:
         Raises:
             K230PrivGzipError: If version command fails
         """
-        args = ["-V"]
-        result = self._execute_command(args)
-        return result.stdout.decode('utf-8').strip()
+        return self.version
+
+
+# Largest single write of command output to stdout
+OUTPUT_CHUNK_SIZE = 1024 * 1024
+
+
+def write_output(stream: BinaryIO, data: bytes) -> None:
+    """Write data to a stream in chunks, without copying it"""
+    with memoryview(data) as view:
+        for offset in range(0, len(view), OUTPUT_CHUNK_SIZE):
+            stream.write(view[offset:offset + OUTPUT_CHUNK_SIZE])
 
 
 def setup_logging(verbose: bool = False) -> None:
@@ -437,8 +631,94 @@ def setup_logging(verbose: bool = False) -> None:
     )
 
 
-def create_argument_parser() -> argparse.ArgumentParser:
-    """Create command line argument parser"""
+def _add_compress_parser(subparsers) -> None:
+    compress_parser = subparsers.add_parser('compress', help='Compress a file')
+    compress_parser.add_argument('input', help='Input file path')
+    compress_parser.add_argument('-o', '--output', help='Output file path')
+    compress_parser.add_argument('-k', '--keep', action='store_true', help='Keep original file')
+    compress_parser.add_argument('-f', '--force', action='store_true', help='Force overwrite')
+    compress_parser.add_argument('-l', '--level', type=int, choices=range(MIN_COMPRESSION_LEVEL, MAX_COMPRESSION_LEVEL + 1), 
+                               help=f'Compression level ({MIN_COMPRESSION_LEVEL}-{MAX_COMPRESSION_LEVEL})')
+    compress_parser.add_argument('-S', '--suffix', default='.gz', help='Suffix for compressed files')
+
+
+def _add_decompress_parser(subparsers) -> None:
+    decompress_parser = subparsers.add_parser('decompress', help='Decompress a file')
+    decompress_parser.add_argument('input', help='Input file path')
+    decompress_parser.add_argument('-o', '--output', help='Output file path')
+    decompress_parser.add_argument('-k', '--keep', action='store_true', help='Keep original file')
+    decompress_parser.add_argument('-f', '--force', action='store_true', help='Force overwrite')
+
+
+def _add_compress_data_parser(subparsers) -> None:
+    compress_data_parser = subparsers.add_parser('compress-data', help='Compress data from stdin')
+    compress_data_parser.add_argument('data', nargs='?', help='Data to compress (optional, reads from stdin)')
+    compress_data_parser.add_argument('-o', '--output', help='Output file path')
+    compress_data_parser.add_argument('-l', '--level', type=int, choices=range(MIN_COMPRESSION_LEVEL, MAX_COMPRESSION_LEVEL + 1), 
+                                      help=f'Compression level ({MIN_COMPRESSION_LEVEL}-{MAX_COMPRESSION_LEVEL})')
+
+
+def _add_decompress_data_parser(subparsers) -> None:
+    decompress_data_parser = subparsers.add_parser('decompress-data', help='Decompress data from stdin')
+    decompress_data_parser.add_argument('data', nargs='?', help='Data to decompress (optional, reads from stdin)')
+    decompress_data_parser.add_argument('-o', '--output', help='Output file path')
+
+
+def _add_test_parser(subparsers) -> None:
+    test_parser = subparsers.add_parser('test', help='Test compressed file integrity')
+    test_parser.add_argument('input', help='Input file path')
+
+
+def _add_list_parser(subparsers) -> None:
+    list_parser = subparsers.add_parser('list', help='List compressed file information')
+    list_parser.add_argument('input', help='Input file path')
+
+
+def _add_version_parser(subparsers) -> None:
+    subparsers.add_parser('version', help='Show version information')
+
+
+# Subcommand parser builders, in the order they are listed in --help
+SUBCOMMAND_PARSERS: Dict[str, Callable[[Any], None]] = {
+    'compress': _add_compress_parser,
+    'decompress': _add_decompress_parser,
+    'compress-data': _add_compress_data_parser,
+    'decompress-data': _add_decompress_data_parser,
+    'test': _add_test_parser,
+    'list': _add_list_parser,
+    'version': _add_version_parser,
+}
+
+
+def _requested_command(argv: Sequence[str]) -> Optional[str]:
+    """
+    Find the subcommand named on the command line.
+
+    Returns None when top-level help is requested or the command line is
+    not understood, in which case every subparser has to be built.
+    """
+    args = iter(argv)
+    for arg in args:
+        if arg in SUBCOMMAND_PARSERS:
+            return arg
+        if arg in ('-v', '--verbose') or arg.startswith('--executable='):
+            continue
+        if arg == '--executable':
+            next(args, None)
+            continue
+        return None
+
+    return None
+
+
+def create_argument_parser(argv: Optional[Sequence[str]] = None) -> argparse.ArgumentParser:
+    """
+    Create command line argument parser.
+
+    Args:
+        argv: Command line to be parsed. When it names a subcommand, only
+              that subcommand's parser is built; None builds all of them.
+    """
     parser = argparse.ArgumentParser(
         description='Python wrapper for k230_priv_gzip with cross-platform support',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -464,54 +744,50 @@ Examples:
     )
     
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
-    
-    # Compress command
-    compress_parser = subparsers.add_parser('compress', help='Compress a file')
-    compress_parser.add_argument('input', help='Input file path')
-    compress_parser.add_argument('-o', '--output', help='Output file path')
-    compress_parser.add_argument('-k', '--keep', action='store_true', help='Keep original file')
-    compress_parser.add_argument('-f', '--force', action='store_true', help='Force overwrite')
-    compress_parser.add_argument('-l', '--level', type=int, choices=range(1, 10), 
-                               help='Compression level (1-9)')
-    compress_parser.add_argument('-S', '--suffix', default='.gz', help='Suffix for compressed files')
-    
-    # Decompress command
-    decompress_parser = subparsers.add_parser('decompress', help='Decompress a file')
-    decompress_parser.add_argument('input', help='Input file path')
-    decompress_parser.add_argument('-o', '--output', help='Output file path')
-    decompress_parser.add_argument('-k', '--keep', action='store_true', help='Keep original file')
-    decompress_parser.add_argument('-f', '--force', action='store_true', help='Force overwrite')
-    
-    # Compress data command
-    compress_data_parser = subparsers.add_parser('compress-data', help='Compress data from stdin')
-    compress_data_parser.add_argument('data', nargs='?', help='Data to compress (optional, reads from stdin)')
-    compress_data_parser.add_argument('-o', '--output', help='Output file path')
-    compress_data_parser.add_argument('-l', '--level', type=int, choices=range(1, 10), 
-                                      help='Compression level (1-9)')
-    
-    # Decompress data command
-    decompress_data_parser = subparsers.add_parser('decompress-data', help='Decompress data from stdin')
-    decompress_data_parser.add_argument('data', nargs='?', help='Data to decompress (optional, reads from stdin)')
-    decompress_data_parser.add_argument('-o', '--output', help='Output file path')
-    
-    # Test command
-    test_parser = subparsers.add_parser('test', help='Test compressed file integrity')
-    test_parser.add_argument('input', help='Input file path')
-    
-    # List command
-    list_parser = subparsers.add_parser('list', help='List compressed file information')
-    list_parser.add_argument('input', help='Input file path')
-    
-    # Version command
-    subparsers.add_parser('version', help='Show version information')
+
+    command = _requested_command(argv) if argv is not None else None
+    if command is not None:
+        SUBCOMMAND_PARSERS[command](subparsers)
+    else:
+        for add_parser in SUBCOMMAND_PARSERS.values():
+            add_parser(subparsers)
     
     return parser
 
 
+# Defaults of the subcommands _parse_simple_command handles, matching the
+# argparse definitions above
+SIMPLE_COMMAND_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    'compress': {'output': None, 'keep': False, 'force': False, 'level': None, 'suffix': '.gz'},
+    'decompress': {'output': None, 'keep': False, 'force': False},
+    'test': {},
+}
+
+
+def _parse_simple_command(argv: Sequence[str]) -> Optional[argparse.Namespace]:
+    """
+    Parse the common '<command> <file>' and 'version' command lines
+    without building the argument parser.
+
+    Returns None for any other command line, which then goes through
+    argparse as usual.
+    """
+    if argv == ['version']:
+        return argparse.Namespace(executable=None, verbose=False, command='version')
+
+    if len(argv) != 2 or argv[0] not in SIMPLE_COMMAND_DEFAULTS or argv[1].startswith('-'):
+        return None
+
+    return argparse.Namespace(executable=None, verbose=False, command=argv[0], input=argv[1],
+                              **SIMPLE_COMMAND_DEFAULTS[argv[0]])
+
+
 def main() -> None:
     """Main entry point"""
-    parser = create_argument_parser()
-    args = parser.parse_args()
+    argv = sys.argv[1:]
+    args = _parse_simple_command(argv)
+    if args is None:
+        args = create_argument_parser(argv).parse_args(argv)
     
     # Setup logging
     setup_logging(args.verbose)
@@ -544,7 +820,7 @@ def main() -> None:
             if args.data:
                 data = args.data.encode('utf-8')
             else:
-                data = sys.stdin.buffer.read()
+                data = sys.stdin.buffer
 
             compressed_data = gzip_tool.compress_data(data, args.level)
             
@@ -553,13 +829,13 @@ def main() -> None:
                     f.write(compressed_data)
                 print(f"Compressed data written to: {args.output}")
             else:
-                sys.stdout.buffer.write(compressed_data)
+                write_output(sys.stdout.buffer, compressed_data)
 
         elif args.command == 'decompress-data':
             if args.data:
                 data = args.data.encode('utf-8')
             else:
-                data = sys.stdin.buffer.read()
+                data = sys.stdin.buffer
             
             decompressed_data = gzip_tool.decompress_data(data)
             
@@ -568,7 +844,7 @@ def main() -> None:
                     f.write(decompressed_data)
                 print(f"Decompressed data written to: {args.output}")
             else:
-                sys.stdout.buffer.write(decompressed_data)
+                write_output(sys.stdout.buffer, decompressed_data)
 
         elif args.command == 'test':
             is_valid = gzip_tool.test_file(args.input)
@@ -594,7 +870,7 @@ def main() -> None:
             print(version)
 
         else:
-            parser.print_help()
+            create_argument_parser().print_help()
             sys.exit(1)
 
     except K230PrivGzipError as e:
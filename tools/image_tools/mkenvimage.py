@@ -14,12 +14,10 @@ The input file should contain key=value pairs, one per line.
 Empty lines and comments (lines starting with #) are ignored.
 """
 
-import argparse
+import io
 import os
 import sys
-import struct
 import zlib
-from pathlib import Path
 
 
 class MkenvImageError(Exception):
@@ -53,55 +51,46 @@ class MkenvImage:
                 return sys.stdin.read().encode('utf-8')
         else:
             try:
-                with open(input_path, 'rb') as f:
+                # Unbuffered: FileIO sizes the result from fstat() and
+                # reads straight into it, with no BufferedReader copy
+                with open(input_path, 'rb', buffering=0) as f:
                     return f.read()
             except IOError as e:
                 raise MkenvImageError(f"Can't open \"{input_path}\": {e}")
     
     def parse_environment_data(self, file_content, env_size):
         """Parse environment data from file content."""
+        return self.parse_environment_lines(io.BytesIO(file_content), env_size)
+
+    def parse_environment_lines(self, lines, env_size):
+        """Parse environment data from an iterable of raw lines (e.g. a binary file).
+
+        Lines are consumed one at a time, so piped input never has to be held
+        in memory as a whole; parsing stops as soon as env_size is exceeded.
+        """
         env_data = bytearray()
-        i = 0
-        file_size = len(file_content)
-        
-        while i < file_size and len(env_data) < env_size - 1:
-            char = file_content[i]
-            
-            if char == ord('\n'):
-                if i == 0 or file_content[i-1] == ord('\n'):
+        for line in lines:
+            if line.startswith(b'#'):
+                # Comment lines are dropped together with their newline
+                continue
+            if line.endswith(b'\n'):
+                line = line[:-1]
+                if not line:
                     # Skip empty lines
-                    i += 1
                     continue
-                elif file_content[i-1] == ord('\\'):
+                if line.endswith(b'\\'):
                     # Embedded newline in a variable
                     # Replace backslash with newline
-                    if len(env_data) > 0:
-                        env_data[-1] = ord('\n')
-                    i += 1
+                    env_data += line[:-1]
+                    env_data.append(0x0a)
                 else:
                     # End of a variable
+                    env_data += line
                     env_data.append(0)
-                    i += 1
-            elif (i == 0 or file_content[i-1] == ord('\n')) and char == ord('#'):
-                # Comment line, skip until newline
-                i += 1
-                while i < file_size and file_content[i] != ord('\n'):
-                    i += 1
-            else:
-                env_data.append(char)
-                i += 1
-        
-        # Check if there's meaningful content left in the file
-        remaining_content = file_content[i:]
-        for j, char in enumerate(remaining_content):
-            if char == ord('\n'):
-                if j == 0 or (j > 0 and remaining_content[j-1] == ord('\n')):
-                    continue
-            elif (j == 0 or (j > 0 and remaining_content[j-1] == ord('\n'))) and char == ord('#'):
-                # Skip comment
-                while j < len(remaining_content) and remaining_content[j] != ord('\n'):
-                    j += 1
             else:
+                # Whatever follows the last newline is copied as-is
+                env_data += line
+            if len(env_data) > env_size - 1:
                 raise MkenvImageError("The environment file is too large for the target environment storage")
         
         # Ensure proper termination
@@ -117,14 +106,14 @@ class MkenvImage:
         return bytes(env_data)
     
     def calculate_crc(self, data):
-        """Calculate CRC32 for the environment data."""
+        """Calculate CRC32 for the environment data (any bytes-like object)."""
         return zlib.crc32(data) & 0xffffffff
 
     def create_environment_image(self, env_data, data_size, redundant=False, 
                                big_endian=False, pad_byte=0xff):
         """Create the complete environment image."""
         # Allocate buffer for the entire image
-        image = bytearray([pad_byte] * data_size)
+        image = bytearray(bytes((pad_byte,)) * data_size)
         
         # Calculate environment size (excluding CRC and redundant byte)
         env_size = data_size - self.crc_size - (1 if redundant else 0)
@@ -137,34 +126,40 @@ class MkenvImage:
         env_offset = self.crc_size + (1 if redundant else 0)
         image[env_offset:env_offset + len(env_data)] = env_data
         
-        # Calculate and set CRC
-        crc = self.calculate_crc(image[env_offset:env_offset + env_size])
-        
-        if big_endian:
-            crc_bytes = struct.pack('>I', crc)
-        else:
-            crc_bytes = struct.pack('<I', crc)
+        # Calculate and set CRC over a view of the image, not a copy
+        with memoryview(image) as view:
+            crc = self.calculate_crc(view[env_offset:env_offset + env_size])
         
+        crc_bytes = crc.to_bytes(self.crc_size, 'big' if big_endian else 'little')
         image[0:self.crc_size] = crc_bytes
         
         # Set redundant flag if needed
         if redundant:
             image[self.crc_size] = 1
         
-        return bytes(image)
+        return image
     
     def write_output_file(self, output_path, data):
-        """Write data to output file."""
+        """Write data (any bytes-like object) to output file without copying it."""
         if output_path == "-":
             # Write to stdout
             if hasattr(sys.stdout, 'buffer'):
                 sys.stdout.buffer.write(data)
             else:
-                sys.stdout.write(data.decode('latin1'))
+                sys.stdout.write(str(data, 'latin1'))
         else:
             try:
-                with open(output_path, 'wb') as f:
-                    f.write(data)
+                # One-shot write straight to the fd, no buffered IO layer
+                fd = os.open(output_path,
+                             os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0),
+                             0o644)
+                try:
+                    with memoryview(data) as view:
+                        written = 0
+                        while written < len(view):
+                            written += os.write(fd, view[written:])
+                finally:
+                    os.close(fd)
             except IOError as e:
                 raise MkenvImageError(f"Can't open output file \"{output_path}\": {e}")
     
@@ -176,9 +171,17 @@ class MkenvImage:
             raise MkenvImageError("Please specify the size of the environment partition.")
         
         # Read and parse input file
-        file_content = self.read_input_file(input_path)
         env_size = data_size - self.crc_size - (1 if redundant else 0)
-        env_data = self.parse_environment_data(file_content, env_size)
+        if input_path == "-":
+            # Parse stdin as it arrives instead of reading it all first
+            if hasattr(sys.stdin, 'buffer'):
+                lines = sys.stdin.buffer
+            else:
+                lines = (line.encode('utf-8') for line in sys.stdin)
+            env_data = self.parse_environment_lines(lines, env_size)
+        else:
+            file_content = self.read_input_file(input_path)
+            env_data = self.parse_environment_data(file_content, env_size)
         
         # Create the environment image
         image_data = self.create_environment_image(
@@ -191,6 +194,9 @@ class MkenvImage:
 
 def main():
     """Main entry point."""
+    # Only the CLI needs argparse; keep it out of library imports
+    import argparse
+
     parser = argparse.ArgumentParser(
         description='Generate U-Boot environment image from key=value text file',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -8,18 +8,26 @@ handling different operating systems and providing a clean API for
 creating and manipulating U-Boot images.
 """
 
+import functools
+import json
 import os
 import sys
 import subprocess
 import argparse
 import logging
-import platform
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Union, Dict, Any
+from typing import Iterable, List, Optional, Tuple, Union, Dict, Any
 from enum import Enum
 
 
+logger = logging.getLogger(__name__)
+
+# Fixed for the life of the process, so checked once at import
+IS_WINDOWS = sys.platform == "win32"
+
+
 class Architecture(Enum):
     """Supported architectures"""
     ALPHA = "alpha"
@@ -100,6 +108,10 @@ class ImageType(Enum):
     ZYNQMPIMAGE = "zynqmpimage"
 
 
+# Image type names accepted by mkimage's -T option
+SUPPORTED_IMAGE_TYPES = tuple(t.value for t in ImageType if t is not ImageType.INVALID)
+
+
 class CompressionType(Enum):
     """Supported compression types"""
     NONE = "none"
@@ -111,6 +123,41 @@ class CompressionType(Enum):
     ZSTD = "zstd"
 
 
+# create_image options in command line order: (flag, parameter, takes a value)
+CREATE_OPTIONS = (
+    ("-A", "arch", True),
+    ("-O", "os_type", True),
+    ("-T", "image_type", True),
+    ("-C", "compression", True),
+    ("-a", "load_addr", True),
+    ("-e", "entry_point", True),
+    ("-n", "image_name", True),
+    ("-R", "second_image_name", True),
+    ("-x", "xip", False),
+    ("-s", "no_data", False),
+    ("-q", "quiet", False),
+    ("-v", "verbose", False),
+)
+
+# create_fit_image options following the FIT source and input files
+FIT_OPTIONS = (
+    ("-E", "external_data", False),
+    ("-B", "align_size", True),
+    ("-t", "update_timestamp", False),
+    # Signing options
+    ("-k", "key_dir", True),
+    ("-K", "key_dest", True),
+    ("-g", "key_name_hint", True),
+    ("-G", "signing_key", True),
+    ("-c", "comment", True),
+    ("-F", "resign", False),
+    ("-p", "external_pos", True),
+    ("-r", "required_keys", False),
+    ("-N", "openssl_engine", True),
+    ("-o", "algorithm", True),
+)
+
+
 class MkImageError(Exception):
     """Custom exception for mkimage operations"""
     pass
@@ -137,12 +184,17 @@ class MkImage:
             MkImageError: If the executable cannot be found.
         """
         self.executable_path = self._find_executable(executable_path)
-        self.logger = logging.getLogger(__name__)
+        self.logger = logger
         
-    def _find_executable(self, provided_path: Optional[str] = None) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _find_executable(provided_path: Optional[str] = None) -> str:
         """
         Find the mkimage executable on the system, handling Windows naming conventions.
         
+        The result is cached, so further wrapper instances in the same
+        process do not probe the filesystem again.
+        
         Args:
             provided_path: Explicit path to the executable
             
@@ -164,7 +216,7 @@ class MkImage:
                 raise MkImageError(f"Executable not found or not executable: {provided_path}")
 
         # Determine the correct executable name for the platform's local search
-        if platform.system() == "Windows":
+        if IS_WINDOWS:
             full_executable_name = f"{executable_name}.exe"
         else:
             full_executable_name = executable_name
@@ -174,8 +226,11 @@ class MkImage:
         script_dir = Path(__file__).resolve().parent
         local_executable = script_dir / "bin" / full_executable_name
 
-        if local_executable.exists() and os.access(local_executable, os.X_OK):
-            return str(local_executable.resolve())
+        # shutil.which also gets executability right on Windows, where
+        # os.access(X_OK) is true for any readable file
+        bundled_executable = shutil.which(str(local_executable))
+        if bundled_executable:
+            return bundled_executable
 
         # 3. Try to find in system PATH using shutil.which (platform-aware)
         # shutil.which handles platform differences (like 'which' vs 'where') 
@@ -191,6 +246,26 @@ class MkImage:
             "and accessible via PATH, or provide the path explicitly."
         )
     
+    @staticmethod
+    def _append_options(args: List[str], table: Tuple[Tuple[str, str, bool], ...],
+                        values: Dict[str, Any]) -> None:
+        """
+        Append the options from an option table that are set in values.
+        
+        Args:
+            args: Command line arguments to extend
+            table: (flag, parameter, takes a value) entries
+            values: Parameter values by name; enum members give their value
+        """
+        for flag, name, takes_value in table:
+            value = values[name]
+            if not value:
+                continue
+            if takes_value:
+                args.extend([flag, value.value if isinstance(value, Enum) else value])
+            else:
+                args.append(flag)
+    
     def _execute_command(self, args: List[str], input_data: Optional[bytes] = None,
                         capture_output: bool = True) -> subprocess.CompletedProcess:
         """
@@ -199,7 +274,8 @@ class MkImage:
         Args:
             args: Command line arguments
             input_data: Data to pipe to stdin (optional)
-            capture_output: Whether to capture stdout/stderr
+            capture_output: Whether to capture stdout. stderr is always
+                            captured so failures can report it.
             
         Returns:
             subprocess.CompletedProcess object
@@ -210,21 +286,16 @@ class MkImage:
         cmd = [self.executable_path] + args
         
         try:
-            self.logger.debug(f"Executing command: {' '.join(cmd)}")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"Executing command: {' '.join(cmd)}")
             
+            run_kwargs: Dict[str, Any] = {'stderr': subprocess.PIPE}
+            if capture_output:
+                run_kwargs['stdout'] = subprocess.PIPE
             if input_data is not None:
-                result = subprocess.run(
-                    cmd,
-                    input=input_data,
-                    capture_output=capture_output,
-                    check=False
-                )
-            else:
-                result = subprocess.run(
-                    cmd,
-                    capture_output=capture_output,
-                    check=False
-                )
+                run_kwargs['input'] = input_data
+
+            result = subprocess.run(cmd, check=False, **run_kwargs)
             
             # Check for errors
             if result.returncode != 0:
@@ -290,45 +361,21 @@ class MkImage:
                 raise MkImageError(f"Data file not found: {data_file}")
         
         # Add options
-        if arch:
-            arch_value = arch.value if isinstance(arch, Architecture) else arch
-            args.extend(["-A", arch_value])
-        
-        if os_type:
-            os_value = os_type.value if isinstance(os_type, OperatingSystem) else os_type
-            args.extend(["-O", os_value])
-        
-        if image_type:
-            type_value = image_type.value if isinstance(image_type, ImageType) else image_type
-            args.extend(["-T", type_value])
-        
-        if compression:
-            comp_value = compression.value if isinstance(compression, CompressionType) else compression
-            args.extend(["-C", comp_value])
-        
-        if load_addr:
-            args.extend(["-a", load_addr])
-        
-        if entry_point:
-            args.extend(["-e", entry_point])
-        
-        if image_name:
-            args.extend(["-n", image_name])
-        
-        if second_image_name:
-            args.extend(["-R", second_image_name])
-        
-        if xip:
-            args.append("-x")
-        
-        if no_data:
-            args.append("-s")
-        
-        if quiet:
-            args.append("-q")
-        
-        if verbose:
-            args.append("-v")
+        options = {
+            'arch': arch,
+            'os_type': os_type,
+            'image_type': image_type,
+            'compression': compression,
+            'load_addr': load_addr,
+            'entry_point': entry_point,
+            'image_name': image_name,
+            'second_image_name': second_image_name,
+            'xip': xip,
+            'no_data': no_data,
+            'quiet': quiet,
+            'verbose': verbose,
+        }
+        self._append_options(args, CREATE_OPTIONS, options)
         
         # Add data files
         args.extend(["-d", ":".join(data_files)])
@@ -341,6 +388,30 @@ class MkImage:
 
         return output_file
     
+    def create_images(self, specs: Iterable[Dict[str, Any]],
+                      max_workers: Optional[int] = None) -> List[str]:
+        """
+        Create several U-Boot images concurrently.
+        
+        mkimage writes one image per invocation, so the spawns cannot be
+        merged; instead each image gets its own mkimage process and threads
+        only wait on them.
+        
+        Args:
+            specs: create_image keyword arguments, one dict per image
+            max_workers: Number of images created at once, defaults to
+                         the CPU count
+            
+        Returns:
+            Paths to the created image files, in the order of specs
+            
+        Raises:
+            MkImageError: If creating any of the images fails
+        """
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            futures = [executor.submit(self.create_image, **spec) for spec in specs]
+            return [future.result() for future in futures]
+    
     def list_image_info(self, image_file: str, image_type: Optional[Union[ImageType, str]] = None,
                        quiet: bool = False) -> Dict[str, Any]:
         """
@@ -451,45 +522,22 @@ class MkImage:
                 raise MkImageError(f"Ramdisk file not found: {ramdisk_file}")
             args.extend(["-i", ramdisk_file])
         
-        if external_data:
-            args.append("-E")
-        
-        if align_size:
-            args.extend(["-B", align_size])
-        
-        if update_timestamp:
-            args.append("-t")
-        
-        # Signing options
-        if key_dir:
-            args.extend(["-k", key_dir])
-        
-        if key_dest:
-            args.extend(["-K", key_dest])
-        
-        if key_name_hint:
-            args.extend(["-g", key_name_hint])
-        
-        if signing_key:
-            args.extend(["-G", signing_key])
-        
-        if comment:
-            args.extend(["-c", comment])
-        
-        if resign:
-            args.append("-F")
-        
-        if external_pos:
-            args.extend(["-p", external_pos])
-        
-        if required_keys:
-            args.append("-r")
-        
-        if openssl_engine:
-            args.extend(["-N", openssl_engine])
-        
-        if algorithm:
-            args.extend(["-o", algorithm])
+        options = {
+            'external_data': external_data,
+            'align_size': align_size,
+            'update_timestamp': update_timestamp,
+            'key_dir': key_dir,
+            'key_dest': key_dest,
+            'key_name_hint': key_name_hint,
+            'signing_key': signing_key,
+            'comment': comment,
+            'resign': resign,
+            'external_pos': external_pos,
+            'required_keys': required_keys,
+            'openssl_engine': openssl_engine,
+            'algorithm': algorithm,
+        }
+        self._append_options(args, FIT_OPTIONS, options)
         
         # Add output file
         args.append(output_file)
@@ -499,6 +547,18 @@ class MkImage:
         
         return output_file
     
+    @functools.cached_property
+    def version(self) -> str:
+        """
+        Version of mkimage, queried from the tool on first access.
+        
+        Raises:
+            MkImageError: If version command fails
+        """
+        args = ["-V"]
+        result = self._execute_command(args)
+        return result.stdout.decode('utf-8').strip()
+
     def get_version(self) -> str:
         """
         Get the version of mkimage.
@@ -509,37 +569,57 @@ class MkImage:
         Raises:
             MkImageError: If version command fails
         """
-        args = ["-V"]
-        result = self._execute_command(args)
-        return result.stdout.decode('utf-8').strip()
+        return self.version
     
-    def get_supported_image_types(self) -> List[str]:
+    @functools.cached_property
+    def probed_image_types(self) -> List[str]:
         """
-        Get list of supported image types.
+        Image types supported by the mkimage executable, queried from the
+        tool on first access.
         
-        Returns:
-            List of supported image type names
-            
         Raises:
             MkImageError: If command fails
         """
         args = ["-T", "list"]
         result = self._execute_command(args)
         
-        # Parse the output to extract image types
-        output = result.stdout.decode('utf-8')
-        lines = output.strip().split('\n')
+        # Parse the output to extract image types; mkimage prints the list
+        # as an error message, i.e. on stderr
+        output = (result.stdout or result.stderr).decode('utf-8')
+        lines = output.strip().splitlines()
         
         image_types = []
         for line in lines[1:]:  # Skip the first line (error message)
-            line = line.strip()
-            if line and not line.startswith('Invalid'):
-                # Extract the image type name (first word)
-                parts = line.split()
-                if parts:
-                    image_types.append(parts[0])
+            # Extract the image type name (first word)
+            parts = line.split(None, 1)
+            if parts and not parts[0].startswith('Invalid'):
+                image_types.append(parts[0])
         
         return image_types
+    
+    def get_supported_image_types(self) -> List[str]:
+        """
+        Get list of supported image types.
+        
+        These are the ImageType values, which match the bundled mkimage, so
+        no process is started; probe_supported_image_types asks the tool.
+        
+        Returns:
+            List of supported image type names
+        """
+        return list(SUPPORTED_IMAGE_TYPES)
+    
+    def probe_supported_image_types(self) -> List[str]:
+        """
+        Get list of image types supported by the mkimage executable in use.
+        
+        Returns:
+            List of supported image type names
+            
+        Raises:
+            MkImageError: If command fails
+        """
+        return list(self.probed_image_types)
 
 
 def setup_logging(verbose: bool = False) -> None:
@@ -562,6 +642,7 @@ Examples:
   %(prog)s create -d kernel.bin -A riscv -O linux -T kernel -C gzip -o uImage
   %(prog)s list uImage
   %(prog)s fit -f fit.its -o fitImage
+  %(prog)s batch images.json
   %(prog)s version
         """
     )
@@ -612,6 +693,11 @@ Examples:
     fit_parser.add_argument('-B', '--align', help='Align size (hex)')
     fit_parser.add_argument('-t', '--update-timestamp', action='store_true', help='Update timestamp')
     
+    # Batch command
+    batch_parser = subparsers.add_parser('batch', help='Create several U-Boot images concurrently')
+    batch_parser.add_argument('spec', help='JSON file with a list of create_image arguments, one object per image')
+    batch_parser.add_argument('-j', '--jobs', type=int, help='Images created at once (default: CPU count)')
+    
     # Version command
     subparsers.add_parser('version', help='Show version information')
     
@@ -677,6 +763,12 @@ def main() -> None:
             )
             print(f"Created FIT image: {output_path}")
 
+        elif args.command == 'batch':
+            with open(args.spec, 'r') as f:
+                specs = json.load(f)
+            for output_path in mkimage_tool.create_images(specs, args.jobs):
+                print(f"Created image: {output_path}")
+
         elif args.command == 'version':
             version = mkimage_tool.get_version()
             print(version)
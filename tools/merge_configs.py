@@ -9,60 +9,64 @@ import os
 import sys
 import re
 
+# A 'CONFIG_NAME=value' line
+CONFIG_LINE_RE = re.compile(r'^(CONFIG_[A-Za-z0-9_]+)=(.*)$')
+
+# Spellings of an 'enabled' flag value
+ENABLED_VALUES = frozenset({'1', 'true', 'True', 'TRUE', 'y', 'Y', 'yes', 'YES', 'on', 'ON'})
+
 def is_enabled(value):
     """Check if a value represents 'enabled' state."""
     if not value:
         return False
-    enabled_values = {'1', 'true', 'True', 'TRUE', 'y', 'Y', 'yes', 'YES', 'on', 'ON'}
-    return str(value).strip() in enabled_values
-
-def read_config_lines(file_path):
-    """Read config file and return lines."""
-    if not os.path.exists(file_path):
-        print(f"Error: Config file not found: {file_path}")
-        return []
-
-    try:
-        with open(file_path, 'r') as f:
-            return f.readlines()
-    except Exception as e:
-        print(f"Error reading {file_path}: {e}")
-        return []
+    return str(value).strip() in ENABLED_VALUES
 
 def parse_samples_config(file_path):
     """Parse samples config into dictionary."""
-    if not file_path or not os.path.exists(file_path):
+    if not file_path:
         return {}
 
     samples = {}
-    with open(file_path, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-            match = re.match(r'^(CONFIG_[A-Za-z0-9_]+)=(.*)$', line)
-            if match:
-                samples[match.group(1)] = match.group(2)
+    try:
+        with open(file_path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                match = CONFIG_LINE_RE.match(line)
+                if match:
+                    samples[match.group(1)] = match.group(2)
+    except FileNotFoundError:
+        return {}
 
     return samples
 
-def config_exists(lines, config_name):
-    """Check if config exists in lines."""
-    pattern = re.compile(rf'^{config_name}=(.*)$')
-    for line in lines:
-        if pattern.match(line.strip()):
-            return True
-    return False
-
 def merge_defconfig(input_path, samples_path, enable_samples):
     """Merge samples into defconfig if conditions are met."""
-    lines = read_config_lines(input_path)
+    # Read the lines, check CONFIG_SDK_ENABLE_CANMV and collect the configs
+    # already set, all in one pass
+    lines = []
+    existing = set()
+    canmv_enabled = False
+    try:
+        with open(input_path, 'r') as f:
+            for line in f:
+                lines.append(line)
+                stripped = line.strip()
+                if stripped == 'CONFIG_SDK_ENABLE_CANMV=y':
+                    canmv_enabled = True
+                match = CONFIG_LINE_RE.match(stripped)
+                if match:
+                    existing.add(match.group(1))
+    except FileNotFoundError:
+        print(f"Error: Config file not found: {input_path}")
+        return None
+    except Exception as e:
+        print(f"Error reading {input_path}: {e}")
+        return None
     if not lines:
         return None
 
-    # Check if CONFIG_SDK_ENABLE_CANMV is y
-    canmv_enabled = any(line.strip() == 'CONFIG_SDK_ENABLE_CANMV=y' for line in lines)
-
     # Decision logic:
     # 1. If canmv is enabled AND samples not forced → use original
     # 2. Otherwise, merge samples if enabled
@@ -73,7 +77,7 @@ def merge_defconfig(input_path, samples_path, enable_samples):
 
     # Load samples if path provided
     samples = {}
-    if samples_path and os.path.exists(samples_path) and enable_samples:
+    if samples_path and enable_samples:
         samples = parse_samples_config(samples_path)
 
     if not samples:
@@ -81,16 +85,15 @@ def merge_defconfig(input_path, samples_path, enable_samples):
         return lines
     
     # Merge samples that don't already exist
-    merged = lines[:]
     added = 0
     for config_name, config_value in samples.items():
-        if not config_exists(merged, config_name):
-            merged.append(f"{config_name}={config_value}\n")
+        if config_name not in existing:
+            lines.append(f"{config_name}={config_value}\n")
             added += 1
             print(f"  Added: {config_name}={config_value}")
     
     print(f"Merged {added} configs from samples")
-    return merged
+    return lines
 
 def main():
     parser = argparse.ArgumentParser(description='Merge samples config into defconfig')
@@ -1,14 +1,139 @@
 #!/usr/bin/env python3
 import argparse
+import collections
+import functools
+import hashlib
 import subprocess
 import tempfile
 import shutil
 import os
-import glob
+import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
-def run_cmd(cmd, cwd=None):
-    subprocess.check_call(cmd, cwd=cwd)
+# File names the MRI script lexer of binutils ar accepts as a single token
+MRI_FILENAME_RE = re.compile(r'[A-Za-z0-9/\\$:.\-_]+')
+
+def run_cmd(cmd, cwd=None, input=None):
+    # No descriptors here need hiding from ar, and keeping them lets
+    # CPython launch it with posix_spawn instead of fork+exec
+    subprocess.run(cmd, cwd=cwd, input=input, text=True, check=True, close_fds=False)
+
+def mri_safe(paths):
+    """Whether every path can be written into an ar MRI script as is."""
+    return all(MRI_FILENAME_RE.fullmatch(path) for path in paths)
+
+def run_mri_script(ar, output, commands):
+    """Create output from ADDLIB/ADDMOD commands fed to 'ar -M' on stdin."""
+    script = [f"CREATE {output}\n"]
+    # ar puts every member it adds in front of the ones already there, so
+    # the commands are issued back to front. That keeps the archives, and
+    # ADDMOD objects, in input order, but the members of each ADDLIB
+    # archive still come out reversed. Only an archive defining the same
+    # symbol in two members would link differently; merge_by_extraction
+    # (ADDMOD) keeps full member order if that is ever needed.
+    script.extend(reversed(list(commands)))
+    script.append("SAVE\nEND\n")
+    run_cmd([ar, "-M"], input="".join(script))
+
+def merge_with_mri(ar, libs, output):
+    """Merge the archives in a single 'ar -M' run, nothing is extracted to disk."""
+    run_mri_script(ar, output, (f"ADDLIB {lib}\n" for lib in libs))
+
+def find_archives(folder):
+    """Yield the .a files under folder in the order glob's '**/*.a' would.
+
+    One scandir per folder; the entry types come with the listing, so no
+    per-file stat is needed to tell folders from files.
+    """
+    subfolders = []
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                # Hidden names are skipped, as glob does
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir():
+                    subfolders.append(entry.path)
+                elif entry.name.endswith(".a"):
+                    yield entry.path
+    except OSError:
+        return
+    for subfolder in subfolders:
+        yield from find_archives(subfolder)
+
+def extract_archive(ar, lib, extract_dir):
+    """Extract one archive into its own folder and return the extracted objects."""
+    try:
+        os.mkdir(extract_dir)
+    except FileExistsError:
+        pass
+    run_cmd([ar, "x", lib], cwd=extract_dir)
+    with os.scandir(extract_dir) as entries:
+        return [entry.path for entry in entries if entry.name.endswith(".o")]
+
+def object_key(path):
+    """Identify an extracted object by member name, size and content digest."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return os.path.basename(path), len(data), hashlib.blake2b(data, digest_size=16).digest()
+
+def make_workdir(libs):
+    """Create a temporary workdir, in RAM-backed /dev/shm when it has room."""
+    if hasattr(os, "statvfs"):
+        try:
+            # The extracted objects take about as much as the archives
+            st = os.statvfs("/dev/shm")
+            if st.f_bavail * st.f_frsize > 2 * sum(os.path.getsize(lib) for lib in libs):
+                return tempfile.mkdtemp(prefix="merge_a_", dir="/dev/shm")
+        except OSError:
+            pass
+    return tempfile.mkdtemp(prefix="merge_a_")
+
+def merge_by_extraction(ar, libs, output, workdir):
+    """Extract every archive and re-archive the objects, prefixing clashing names."""
+    # Extract each .a into its own subfolder to avoid collisions; the
+    # extractions are independent ar processes, so run them side by side
+    extract_dirs = [
+        os.path.join(workdir, f"{index}_{os.path.basename(lib)}_extract")
+        for index, lib in enumerate(libs)
+    ]
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        extracted = list(executor.map(functools.partial(extract_archive, ar), libs, extract_dirs))
+
+    # Go through the objects in archive order so that clashing names
+    # resolve the same way on every run. Objects repeated byte for byte
+    # under the same name in another archive (e.g. a shared util.o) are
+    # only archived once.
+    kept = []
+    seen = set()
+    for lib, objs in zip(libs, extracted):
+        for obj in sorted(objs):
+            key = object_key(obj)
+            if key in seen:
+                continue
+            seen.add(key)
+            kept.append((lib, obj))
+
+    # Only names found in more than one archive need the archive prefix;
+    # all other objects are archived straight from their extract folder
+    name_counts = collections.Counter(os.path.basename(obj) for _, obj in kept)
+    objects = {}
+    for lib, obj in kept:
+        if name_counts[os.path.basename(obj)] > 1:
+            new_name = f"{os.path.basename(lib).replace('.a','')}_{os.path.basename(obj)}"
+            dest = os.path.join(workdir, new_name)
+            # Same filesystem, so a plain rename(2)
+            os.replace(obj, dest)
+            obj = dest
+        objects[obj] = None
+
+    # Create combined .a, passing the objects on stdin rather than argv
+    # whenever the script can name them
+    if mri_safe([output] + list(objects)):
+        run_mri_script(ar, output, (f"ADDMOD {obj}\n" for obj in objects))
+    else:
+        run_cmd([ar, "rcs", output] + list(objects))
 
 def main():
     parser = argparse.ArgumentParser(description="Merge all .a libraries from a folder into one.")
@@ -26,7 +151,13 @@ def main():
     )
     parser.add_argument(
         "--workdir", default=None,
-        help="Optional working directory (default: temporary folder)"
+        help="Optional working directory for the extraction fallback "
+             "(default: temporary folder, in /dev/shm when it has room)"
+    )
+    parser.add_argument(
+        "--thin", action="store_true",
+        help="Write a thin archive that only references the input archives; "
+             "it is usable only while they stay in place"
     )
     args = parser.parse_args()
 
@@ -34,42 +165,42 @@ def main():
     prefix = args.toolchain_prefix
     if not prefix.endswith("-"):
         prefix += "-"
-    ar = prefix + "ar"
-    ranlib = prefix + "ranlib"
+    # Resolve ar once rather than searching PATH on every run
+    ar = shutil.which(prefix + "ar") or prefix + "ar"
 
     # Find all .a files
-    libs = glob.glob(os.path.join(args.input, "**", "*.a"), recursive=True)
+    libs = list(find_archives(args.input))
     if not libs:
         print(f"No .a files found in {args.input}", file=sys.stderr)
         sys.exit(1)
 
-    # Prepare working directory
-    workdir = args.workdir or tempfile.mkdtemp(prefix="merge_a_")
-    if not os.path.exists(workdir):
-        os.makedirs(workdir)
+    output = os.path.abspath(args.output)
+    libs = [os.path.abspath(lib) for lib in libs]
+    os.makedirs(os.path.dirname(output), exist_ok=True)
 
-    try:
-        # Extract each .a into its own subfolder to avoid collisions
-        for lib in libs:
-            extract_dir = os.path.join(workdir, os.path.basename(lib) + "_extract")
-            os.makedirs(extract_dir, exist_ok=True)
-            run_cmd([ar, "x", os.path.abspath(lib)], cwd=extract_dir)
-            # Rename and move extracted .o files to main workdir
-            for obj in glob.glob(os.path.join(extract_dir, "*.o")):
-                new_name = f"{os.path.basename(lib).replace('.a','')}_{os.path.basename(obj)}"
-                dest = os.path.join(workdir, new_name)
-                shutil.move(obj, dest)
-
-        # Create combined .a
-        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
-        run_cmd([ar, "rcs", os.path.abspath(args.output)] + glob.glob(os.path.join(workdir, "*.o")))
-        run_cmd([ranlib, os.path.abspath(args.output)])
-
-        print(f"Combined library created: {args.output}")
-
-    finally:
-        if args.workdir is None:
-            shutil.rmtree(workdir)
+    if args.thin:
+        # Members stay in the input archives; only the index is written.
+        # ar cannot turn an existing normal archive into a thin one
+        if os.path.exists(output):
+            os.remove(output)
+        run_cmd([ar, "rcsT", output] + libs)
+    elif mri_safe([output] + libs):
+        merge_with_mri(ar, libs, output)
+    else:
+        # Paths an MRI script cannot express; go through the object files
+        if args.workdir:
+            workdir = args.workdir
+            os.makedirs(workdir, exist_ok=True)
+        else:
+            workdir = make_workdir(libs)
+
+        try:
+            merge_by_extraction(ar, libs, output, workdir)
+        finally:
+            if args.workdir is None:
+                shutil.rmtree(workdir)
+
+    print(f"Combined library created: {args.output}")
 
 if __name__ == "__main__":
     main()